@@ -1,299 +1,569 @@
 from EVRPTW_PR_ALNS.file_reader import get_parameters
 from EVRPTW_PR_ALNS.helper_function import Helper
 from EVRPTW_PR_ALNS.Initial import Heuristic
+from EVRPTW_PR_ALNS.solution import Solution
+from EVRPTW_PR_ALNS.telemetry import Telemetry
+from EVRPTW_PR_ALNS.operator_registry import OperatorRegistry
+from EVRPTW_PR_ALNS.run_options import StoppingCriteria, Checkpointing, ParallelHooks
 from EVRPTW_PR_ALNS._algorithms.CR import CustomerRemoval
 from EVRPTW_PR_ALNS._algorithms.CI import CustomerInsertion
 from EVRPTW_PR_ALNS._algorithms.SR import StationRemoval
 from EVRPTW_PR_ALNS._algorithms.SI import StationInsertion
-from random import random, choices
+from random import random, getstate, setstate
 from math import log, exp
 from time import time
+import numpy as np
+import pickle
+import gzip
+import os
 
 
 class ALNS:
-    def __init__(self, file: str, wireless_coverage: str = "none"):
+    def __init__(self, file: str = None, wireless_coverage: str = "none", parameters: dict = None,
+                 cache_dir: str = None, neighbour_k: int = None):
         """
         Initialize ALNS with wireless charging support (silent version)
         :param file: instance file path
-        :param wireless_coverage: wireless coverage level ("none", "light", "moderate", "high")
+        :param wireless_coverage: wireless coverage level ("none", "light", "moderate", "high") or a fraction of every
+        arc between 0 and 1
+        :param parameters: parameters already got from the file reader, the file is not read again if given
+        :param cache_dir: directory of the parsed instance cache of the file reader, None to parse the file
+        :param neighbour_k: number of granular neighbours of a customer, the customer insertions and the initial
+        solution try the positions next to them first and the other positions only if none of them is feasible.
+        None, the default, tries every position as the original search
         """
-        self.parameters = get_parameters(file, wireless_coverage=wireless_coverage)
+        if parameters is None:
+            parameters = get_parameters(file, wireless_coverage=wireless_coverage, cache_dir=cache_dir)
+        self.parameters = parameters
         self.helper = Helper(self.parameters)
         self.cr = CustomerRemoval(self.parameters)
-        self.ci = CustomerInsertion(self.parameters)
+        self.neighbour_k = neighbour_k
+        self.ci = CustomerInsertion(self.parameters, neighbour_k)
         self.sr = StationRemoval(self.parameters)
         self.si = StationInsertion(self.parameters)
-        self.initial = Heuristic(self.parameters)
-        self.wireless_coverage = wireless_coverage
+        self.initial = Heuristic(self.parameters, neighbour_k)
+        self.wireless_coverage = self.parameters.get("coverage_level", wireless_coverage)
+        # anytime result of the current or last run, updated at each new best solution
+        self.best_record = None
+        # number of iterations done by the last run and why it stopped ("iterations", "time", "target", "stagnation")
+        self.iterations = 0
+        self.stop_reason = None
+        # set by cancel() to stop the current run before its next repair
+        self.cancel_requested = False
+        # operator counters of the current or last run
+        self.telemetry = None
+        # operators of each category with their weights, the defaults come from the function dicts
+        self.operators = {}
+        for category, functions in (("normal_cr", self.normal_cr_function_dict()),
+                                    ("route_cr", self.route_cr_function_dict()),
+                                    ("ci", self.ci_function_dict()),
+                                    ("sr", self.sr_function_dict()),
+                                    ("si", self.si_function_dict())):
+            self.operators[category] = OperatorRegistry(category)
+            for name, function in functions.items():
+                self.operators[category].register(name, function)
+
+    def register_operator(self, category, name, function, weight=1.0):
+        """
+        Void function, add an operator to the ones chosen by the runs, or replace the operator with the same name
+        The operators registered here are only known to this instance, the worker processes of parallel.py build
+        their own instance with the default operators
+        :param category: "normal_cr" and "route_cr" take the solution and return the destroyed routes, "ci" takes the
+        routes and the removed customers, "sr" takes the routes, "si" takes one route
+        :param name: name of the operator in its category
+        :param function: the operator function, e.g. self.cr.worst_energy_removal for "normal_cr" or
+        self.cr.greedy_route_removal_GRR for "route_cr"
+        :param weight: weight of the operator at the start of a run
+        """
+        if category not in self.operators:
+            raise ValueError("unknown operator category: " + str(category))
+        self.operators[category].register(name, function, weight)
+
+    def run(self, *args, **kwargs):
+        """
+        Run the ALNS until it stops, same parameters as iter_run
+        :return: best distance, number of vehicles, initial distance, initial number of vehicles, duration, best routes
+        """
+        search = self.iter_run(*args, **kwargs)
+        while True:
+            try:
+                next(search)
+            except StopIteration as stop:
+                return stop.value
+
+    def cancel(self):
+        """
+        Void function, ask the current run to stop before its next repair, it can be called from another thread
+        """
+        self.cancel_requested = True
 
-    def run(
+    def iter_run(
             self, sigma1=30, sigma2=20, sigma3=13, rho=0.45, epsilon=0.9994, mu=0.05, N=25000, Nc=200,
-            Ns=1000, NRR=6000, NSR=10, nRR=1250
+            Ns=1000, NRR=6000, NSR=10, nRR=1250, stopping=None, checkpointing=None, parallel=None, telemetry_file=None,
+            weighting="score"
     ):
+        """
+        Run the ALNS from the initial solution of the heuristic, as a generator yielding each new best solution
+        The search is paused while the consumer handles a yielded solution, the elapsed times include these pauses.
+        Closing the generator or calling cancel() stops the search. The generator can only be closed between two
+        yields, from another thread cancel() stops the search before its next repair, also within a route removal
+        phase or a batch
+        The options are checked together before the initial solution is built
+        :param stopping: StoppingCriteria of the run, only the N iterations if None
+        :param checkpointing: Checkpointing of the run, no saving and no resume if None
+        :param parallel: ParallelHooks of the run, a single search repairing one pair at a time if None
+        :param telemetry_file: file the operator counters of the run are exported to at the end, CSV if the name ends
+        with .csv and JSON otherwise, None for no export. The counters are also kept in self.telemetry, the time and
+        the checks of the pairs repaired by an evaluate function are not measured
+        :param weighting: reward of an operator in the weight updates, "score" for its score per call, "time" for its
+        score per second of run time, scaled by the mean time of a call in its category so that the operators
+        delivering more improvement per second are preferred. "time" needs the batches to be evaluated in this
+        process, without the evaluate function of the parallel hooks
+        :return: yields (iteration, elapsed time, number of vehicles, distance, routes) for the initial solution and
+        each new best solution, returns best distance, number of vehicles, initial distance, initial number of vehicles,
+        duration, best routes
+        """
+        # check the options and their combinations before any work
+        stopping = stopping if stopping is not None else StoppingCriteria()
+        checkpointing = checkpointing if checkpointing is not None else Checkpointing()
+        parallel = parallel if parallel is not None else ParallelHooks()
+        if weighting not in ("score", "time"):
+            raise ValueError("unknown weighting: " + str(weighting))
+        if weighting == "time" and parallel.evaluate is not None and parallel.batched():
+            raise ValueError("the time weighting cannot measure the batches of an evaluate function")
+        batch_size = parallel.batch_size
+        route_batch_size = parallel.route_batch_size
+        time_limit, target, max_stagnation = stopping.time_limit, stopping.target, stopping.max_stagnation
+
         # initiate algorithms, initial solution and helper functions
         helper = Helper(self.parameters)
 
-        # get the initial solution using the heuristic
-        initial_solution = self.initial.initial_solution()
+        # get the initial solution using the heuristic, or the saved state of the search to resume
+        state = None
+        if checkpointing.resume is None:
+            initial_solution = Solution(helper, self.initial.initial_solution())
+        else:
+            state = self.load_checkpoint(checkpointing.resume)
+            initial_solution = Solution(helper, state["initial"])
 
         # get the initial temperature
-        initial_distance = self.helper.total_distance_list(initial_solution)
+        initial_distance = initial_solution.distance
         T = -(mu * initial_distance) / log(0.5)
 
-        # create the list and dict of the functions
-        normal_cr_function_dict = self.normal_cr_function_dict()
-        route_cr_function_dict = self.route_cr_function_dict()
-        ci_function_dict = self.ci_function_dict()
-        sr_function_dict = self.sr_function_dict()
-        si_function_dict = self.si_function_dict()
-
-        normal_cr_list = [key for key, value in normal_cr_function_dict.items()]
-        route_cr_list = [key for key, value in route_cr_function_dict.items()]
-        ci_list = [key for key, value in ci_function_dict.items()]
-        sr_list = [key for key, value in sr_function_dict.items()]
-        si_list = [key for key, value in si_function_dict.items()]
-
-        # create the dict to calculate weight, score and times to be called
-        score_normal_cr = {}
-        score_route_cr = {}
-        score_ci = {}
-        score_sr = {}
-        score_si = {}
-
-        for key in normal_cr_list:
-            score_normal_cr[key] = [1, 0, 0]
-        for key in route_cr_list:
-            score_route_cr[key] = [1, 0, 0]
-        for key in ci_list:
-            score_ci[key] = [1, 0, 0]
-        for key in sr_list:
-            score_sr[key] = [1, 0, 0]
-        for key in si_list:
-            score_si[key] = [1, 0, 0]
+        # the registries hold the weight, score and calling times of the operators, reset to the initial weights
+        score_normal_cr = self.operators["normal_cr"]
+        score_route_cr = self.operators["route_cr"]
+        score_ci = self.operators["ci"]
+        score_sr = self.operators["sr"]
+        score_si = self.operators["si"]
+        for registry in self.operators.values():
+            registry.reset()
+
+        # create the dict of the functions, measured by the telemetry of the run
+        self.telemetry = Telemetry()
+        normal_cr_function_dict = self.telemetry.instrument("normal_cr", score_normal_cr.function_dict())
+        route_cr_function_dict = self.telemetry.instrument("route_cr", score_route_cr.function_dict())
+        ci_function_dict = self.telemetry.instrument("ci", score_ci.function_dict())
+        sr_function_dict = self.telemetry.instrument("sr", score_sr.function_dict())
+        si_function_dict = self.telemetry.instrument("si", score_si.function_dict())
+
+        # the pairs are repaired in this process by the measured functions, unless the batches have an evaluate function
+        measured_functions = {"normal_cr": normal_cr_function_dict, "route_cr": route_cr_function_dict,
+                              "ci": ci_function_dict}
+
+        def repair_batch(pairs, routes, size, route_removal=False):
+            if parallel.evaluate is not None and size > 1:
+                return parallel.evaluate(pairs, routes, route_removal)
+            # the batch stops early if the run is cancelled or the time is over, the pairs left are not repaired
+            repaired = []
+            for cr_algo, ci_algo in pairs:
+                if interrupted():
+                    break
+                repaired.append(self.repair_pair(cr_algo, ci_algo, routes, route_removal, measured_functions))
+            return repaired
+
+        def interrupted():
+            # checked between the repairs of an iteration too, a phase of many repairs does not overrun the limit or
+            # delay a cancellation
+            return self.cancel_requested or (time_limit is not None and time() - start_time >= time_limit)
+        # operator run times measured by the telemetry at the start of the current segments
+        segment_times = {}
 
         # start the process, first to define some parameters
         best_solution = initial_solution
         prev_solution = initial_solution
+        empty_route = [helper.depot_start, helper.depot_end]
 
         # this is the process of ALNS
         start_time = time()
-
-        for i in range(1, N + 1):
+        self.record_best(best_solution, 0, 0.0)
+        last_improvement = 0
+        first_iteration = 1
+        if state is not None:
+            # continue from the saved iteration with the saved solutions, temperature and scores
+            best_solution = Solution(helper, state["best"])
+            prev_solution = Solution(helper, state["prev"])
+            T = state["T"]
+            for category, registry in self.operators.items():
+                registry.set_state(state["scores"][category])
+            start_time = time() - state["elapsed"]
+            self.record_best(best_solution, state["best_iteration"], state["best_elapsed"])
+            last_improvement = state["last_improvement"]
+            first_iteration = state["iteration"] + 1
+            # the operator times of the current segments continue from the saved ones
+            self.telemetry.set_state(state["telemetry"])
+            segment_times.update(state["segment_times"])
+        self.iterations = first_iteration - 1
+        self.stop_reason = "iterations"
+        self.cancel_requested = False
+        yield self.best_update()
+
+        if state is not None:
+            # the random generators continue their sequences as well
+            setstate(state["random_state"])
+            np.random.set_state(state["numpy_state"])
+
+        for i in range(first_iteration, N + 1):
             # Removed print(i) for silent operation
             
             # this is for stations
             if i % NSR == 0:
                 # choose the station removal and station insertion
-                sr_weights = [value[0] for key, value in score_sr.items()]
-                sr_algo = choices(sr_list, weights=sr_weights, k=1)[0]
-
-                si_weights = [value[0] for key, value in score_si.items()]
-                si_algo = choices(si_list, weights=si_weights, k=1)[0]
+                sr_algo = score_sr.select()
+                si_algo = score_si.select()
 
                 # update the calling times of the algorithms
-                score_sr[sr_algo][2] += 1
-                score_si[si_algo][2] += 1
-
-                # destroy and repair
-                destroy = sr_function_dict[sr_algo](prev_solution)
-                repair = []
-                for route in destroy:
-                    repair.append(si_function_dict[si_algo](route))
-
-                # test first whether the repair is feasible or not
-                if helper.feasible(repair):
-                    # the best one has been found, update the current prev and best, and the score
-                    if (
-                            len(repair) < len(best_solution) or (
-                            len(repair) == len(best_solution) and helper.total_distance_list(
-                        repair) < helper.total_distance_list(best_solution))
-                    ):
-                        prev_solution = repair
-                        best_solution = repair
-                        score_sr[sr_algo][1] += sigma1
-                        score_si[si_algo][1] += sigma1
-
-                    # if this one is better than previous but not the best
-                    elif (
-                            len(repair) == len(prev_solution) and helper.total_distance_list(
-                        repair) < helper.total_distance_list(prev_solution)
-                    ):
-                        prev_solution = repair
-                        score_sr[sr_algo][1] += sigma2
-                        score_si[si_algo][1] += sigma2
+                score_sr.called(sr_algo)
+                score_si.called(si_algo)
 
-                    elif (
-                            len(repair) == len(prev_solution) and helper.total_distance_list(
-                        repair) > helper.total_distance_list(prev_solution)
-                    ):
-                        prob = exp(-(helper.total_distance_list(repair) - helper.total_distance_list(prev_solution))/T)
-                        # accept the solution and update the score
-                        if random() <= prob:
-                            prev_solution = repair
-                            score_sr[sr_algo][1] += sigma3
-                            score_si[si_algo][1] += sigma3
+                # destroy and repair, the repair goes through the acceptance as a batch of one
+                destroy = sr_function_dict[sr_algo](prev_solution.routes)
+                repair = prev_solution.derive([si_function_dict[si_algo](route) for route in destroy])
+                prev_solution, best_solution = self.batch_acceptance(
+                    ("sr", "si"), [(sr_algo, si_algo)], [repair], prev_solution, best_solution, T,
+                    sigma1, sigma2, sigma3
+                )
 
             elif i % NRR == 0:
-                # this is for route removal
-                for _ in range(nRR):
-                    route_cr_weights = [value[0] for key, value in score_route_cr.items()]
-                    route_cr_algo = choices(route_cr_list, weights=route_cr_weights, k=1)[0]
-
-                    ci_weights = [value[0] for key, value in score_ci.items()]
-                    ci_algo = choices(ci_list, weights=ci_weights, k=1)[0]
+                # this is for route removal, the attempts are made in batches all starting from the current solution
+                attempts = 0
+                while attempts < nRR and not interrupted():
+                    size = min(route_batch_size, nRR - attempts)
+                    attempts += size
+
+                    pairs = list(zip([score_route_cr.select() for _ in range(size)],
+                                     [score_ci.select() for _ in range(size)]))
+
+                    # destroy and repair, the best fleet reduction of the batch goes through the acceptance
+                    repairs = [
+                        prev_solution.derive(routes)
+                        for routes in repair_batch(pairs, prev_solution, route_batch_size, route_removal=True)
+                    ]
+                    pairs = pairs[:len(repairs)]
 
                     # update the calling times of the algorithms
-                    score_route_cr[route_cr_algo][2] += 1
-                    score_ci[ci_algo][2] += 1
-
-                    # destroy and repair
-                    destroy = route_cr_function_dict[route_cr_algo](prev_solution)
-                    repair = ci_function_dict[ci_algo](destroy, self.cr.removal)
-
-                    # test first whether the repair is feasible or not
-                    if helper.feasible(repair):
-                        # the best one has been found, update the current prev and best, and the score
-                        if (
-                                len(repair) < len(best_solution) or (
-                                len(repair) == len(best_solution) and helper.total_distance_list(
-                            repair) < helper.total_distance_list(best_solution))
-                        ):
-                            prev_solution = repair
-                            best_solution = repair
-                            score_route_cr[route_cr_algo][1] += sigma1
-                            score_ci[ci_algo][1] += sigma1
-
-                        # if this one is better than previous but not the best
-                        elif (
-                                len(repair) == len(prev_solution) and helper.total_distance_list(
-                            repair) < helper.total_distance_list(prev_solution)
-                        ):
-                            prev_solution = repair
-                            score_route_cr[route_cr_algo][1] += sigma2
-                            score_ci[ci_algo][1] += sigma2
-
-                        elif (
-                                len(repair) == len(prev_solution) and helper.total_distance_list(
-                            repair) > helper.total_distance_list(prev_solution)
-                        ):
-                            prob = exp(
-                                -(helper.total_distance_list(repair) - helper.total_distance_list(prev_solution)) / T)
-                            # accept the solution and update the score
-                            if random() <= prob:
-                                prev_solution = repair
-                                score_route_cr[route_cr_algo][1] += sigma3
-                                score_ci[ci_algo][1] += sigma3
+                    for route_cr_algo, ci_algo in pairs:
+                        score_route_cr.called(route_cr_algo)
+                        score_ci.called(ci_algo)
+
+                    prev_solution, best_solution = self.batch_acceptance(
+                        ("route_cr", "ci"), pairs, repairs, prev_solution, best_solution, T, sigma1, sigma2, sigma3
+                    )
 
             else:
-                # this is for the customer removal and insertion
-                # choose the station removal and station insertion
-                normal_cr_weights = [value[0] for key, value in score_normal_cr.items()]
-                normal_cr_algo = choices(normal_cr_list, weights=normal_cr_weights, k=1)[0]
+                # this is for the customer removal and insertion, a batch of pairs all repairing the current solution
+                pairs = list(zip([score_normal_cr.select() for _ in range(batch_size)],
+                                 [score_ci.select() for _ in range(batch_size)]))
 
-                ci_weights = [value[0] for key, value in score_ci.items()]
-                ci_algo = choices(ci_list, weights=ci_weights, k=1)[0]
+                # destroy and repair, the best repair of the batch goes through the acceptance
+                repairs = [prev_solution.derive(routes) for routes in repair_batch(pairs, prev_solution, batch_size)]
+                pairs = pairs[:len(repairs)]
 
                 # update the calling times of the algorithms
-                score_normal_cr[normal_cr_algo][2] += 1
-                score_ci[ci_algo][2] += 1
-
-                # destroy and repair
-                destroy = normal_cr_function_dict[normal_cr_algo](prev_solution)
-                repair = ci_function_dict[ci_algo](destroy, self.cr.removal)
-
-                # test first whether the repair is feasible or not
-                if helper.feasible(repair):
-                    # the best one has been found, update the current prev and best, and the score
-                    if (
-                            len(repair) < len(best_solution) or (
-                            len(repair) == len(best_solution) and helper.total_distance_list(
-                        repair) < helper.total_distance_list(best_solution))
-                    ):
-                        prev_solution = repair
-                        best_solution = repair
-                        score_normal_cr[normal_cr_algo][1] += sigma1
-                        score_ci[ci_algo][1] += sigma1
-
-                    # if this one is better than previous but not the best
-                    elif (
-                            len(repair) == len(prev_solution) and helper.total_distance_list(
-                        repair) < helper.total_distance_list(prev_solution)
-                    ):
-                        prev_solution = repair
-                        score_normal_cr[normal_cr_algo][1] += sigma2
-                        score_ci[ci_algo][1] += sigma2
+                for normal_cr_algo, ci_algo in pairs:
+                    score_normal_cr.called(normal_cr_algo)
+                    score_ci.called(ci_algo)
 
-                    elif (
-                            len(repair) == len(prev_solution) and helper.total_distance_list(
-                        repair) > helper.total_distance_list(prev_solution)
-                    ):
-                        prob = exp(
-                            -(helper.total_distance_list(repair) - helper.total_distance_list(prev_solution)) / T)
-                        # accept the solution and update the score
-                        if random() <= prob:
-                            prev_solution = repair
-                            score_normal_cr[normal_cr_algo][1] += sigma3
-                            score_ci[ci_algo][1] += sigma3
+                prev_solution, best_solution = self.batch_acceptance(
+                    ("normal_cr", "ci"), pairs, repairs, prev_solution, best_solution, T, sigma1, sigma2, sigma3
+                )
 
             # end the removal and insertion operation, try to update the weights
             if i % Nc == 0:
                 # update the weights of the customers
-                for key, value in score_normal_cr.items():
-                    if value[2] != 0:
-                        score_normal_cr[key][0] = value[0] * (1 - rho) + rho * value[1] / value[2]
+                self.update_weights(score_normal_cr, "normal_cr", rho, weighting, segment_times)
+                self.update_weights(score_ci, "ci", rho, weighting, segment_times)
+                self.update_weights(score_route_cr, "route_cr", rho, weighting, segment_times)
 
-                for key, value in score_normal_cr.items():
-                    score_normal_cr[key][1] = 0
-                    score_normal_cr[key][2] = 0
-
-                for key, value in score_ci.items():
-                    if value[2] != 0:
-                        score_ci[key][0] = value[0] * (1 - rho) + rho * value[1] / value[2]
-
-                for key, value in score_ci.items():
-                    score_ci[key][1] = 0
-                    score_ci[key][2] = 0
+            if i % Ns == 0:
+                # update the weights of the stations
+                self.update_weights(score_sr, "sr", rho, weighting, segment_times)
+                self.update_weights(score_si, "si", rho, weighting, segment_times)
+
+            # cooperative search, the best solution is sent to the other searches and a better incoming one is adopted
+            if parallel.migration is not None and i % parallel.migration_interval == 0:
+                for routes in parallel.migration(best_solution.routes):
+                    incoming = Solution(helper, routes)
+                    if incoming.feasible and (
+                            len(incoming) < len(best_solution) or (
+                            len(incoming) == len(best_solution) and incoming.distance < best_solution.distance)
+                    ):
+                        prev_solution = incoming
+                        best_solution = incoming
+
+            # parallel tempering, the current solution may be swapped with the one of another temperature
+            if parallel.swap is not None and i % parallel.swap_interval == 0:
+                prev_solution = prev_solution.derive(parallel.swap(prev_solution.routes, prev_solution.distance, T))
+                if prev_solution.feasible and (
+                        len(prev_solution) < len(best_solution) or (
+                        len(prev_solution) == len(best_solution) and prev_solution.distance < best_solution.distance)
+                ):
+                    best_solution = prev_solution
 
-                for key, value in score_route_cr.items():
-                    if value[2] != 0:
-                        score_route_cr[key][0] = value[0] * (1 - rho) + rho * value[1] / value[2]
+            T = T * epsilon
 
-                for key, value in score_route_cr.items():
-                    score_route_cr[key][1] = 0
-                    score_route_cr[key][2] = 0
+            if empty_route in best_solution:
+                best_solution.remove(empty_route)
+
+            if empty_route in prev_solution:
+                prev_solution.remove(empty_route)
+
+            # keep the anytime result up to date with the new best solutions
+            self.iterations = i
+            improved = best_solution is not self.best_record[5]
+            if improved:
+                last_improvement = i
+                self.record_best(best_solution, i, time() - start_time)
+
+            # save the search state at the end of the iteration, to resume it from the next one
+            if checkpointing.file is not None and i % checkpointing.interval == 0:
+                self.save_checkpoint(checkpointing.file, {
+                    "iteration": i,
+                    "elapsed": time() - start_time,
+                    "T": T,
+                    "initial": initial_solution.routes,
+                    "prev": prev_solution.routes,
+                    "best": best_solution.routes,
+                    "scores": {category: registry.get_state() for category, registry in self.operators.items()},
+                    "last_improvement": last_improvement,
+                    "best_iteration": self.best_record[3],
+                    "best_elapsed": self.best_record[4],
+                    "telemetry": self.telemetry.get_state(),
+                    "segment_times": dict(segment_times),
+                    "random_state": getstate(),
+                    "numpy_state": np.random.get_state()
+                })
+
+            if improved:
+                yield self.best_update()
+
+            # stop before the N iterations if one of the criteria is met
+            if self.cancel_requested:
+                self.stop_reason = "cancelled"
+                break
+            if interrupted():
+                self.stop_reason = "time"
+                break
+            if target is not None and (
+                    len(best_solution) < target[0] or (
+                    len(best_solution) == target[0] and best_solution.distance <= target[1])
+            ):
+                self.stop_reason = "target"
+                break
+            if max_stagnation is not None and i - last_improvement >= max_stagnation:
+                self.stop_reason = "stagnation"
+                break
 
-            if i % Ns == 0:
-                # update the weights of the stations
-                for key, value in score_sr.items():
-                    if value[2] != 0:
-                        score_sr[key][0] = value[0] * (1 - rho) + rho * value[1] / value[2]
+        end_time = time()
+        duration = end_time - start_time
+        if telemetry_file is not None:
+            self.telemetry.export(telemetry_file)
 
-                for key, value in score_sr.items():
-                    score_sr[key][1] = 0
-                    score_sr[key][2] = 0
+        # routes are integer encoded during the search, translate them back to the node names
+        best_routes = [helper.route_names(route) for route in best_solution]
 
-                for key, value in score_si.items():
-                    if value[2] != 0:
-                        score_si[key][0] = value[0] * (1 - rho) + rho * value[1] / value[2]
+        return float(best_solution.distance), len(best_solution), float(
+            initial_solution.distance), len(initial_solution), duration, best_routes
 
-                for key, value in score_si.items():
-                    score_si[key][1] = 0
-                    score_si[key][2] = 0
+    @staticmethod
+    def save_checkpoint(file, state):
+        """
+        Void function, save a search state in a compressed binary file
+        The file is written next to the target first and then renamed, an interrupted save keeps the previous one
+        :param file: checkpoint file path
+        :param state: dict of the search state
+        """
+        temporary = file + ".tmp"
+        with gzip.open(temporary, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, file)
 
-            T = T * epsilon
+    @staticmethod
+    def load_checkpoint(file):
+        """
+        Load a search state saved by save_checkpoint
+        :param file: checkpoint file path
+        :return: dict of the search state
+        """
+        with gzip.open(file, "rb") as f:
+            return pickle.load(f)
 
-            if ["D0", "D0_end"] in best_solution:
-                best_solution.remove(["D0", "D0_end"])
+    def record_best(self, best_solution, iteration, elapsed):
+        """
+        Void function, keep a copy of a new best solution as the anytime result
+        :param best_solution: the new best solution
+        :param iteration: iteration it was found at
+        :param elapsed: time since the start of the iterations in seconds
+        """
+        self.best_record = (float(best_solution.distance), len(best_solution),
+                            [list(route) for route in best_solution], iteration, elapsed, best_solution)
 
-            if ["D0", "D0_end"] in prev_solution:
-                prev_solution.remove(["D0", "D0_end"])
+    def best_so_far(self):
+        """
+        The best solution found so far by the current or the last run, it can be asked at any moment
+        :return: distance, number of vehicles, routes, iteration and time it was found at, None before any run
+        """
+        record = self.best_record
+        if record is None:
+            return None
+        distance, vehicles, routes, iteration, elapsed, _ = record
+        return distance, vehicles, [self.helper.route_names(route) for route in routes], iteration, elapsed
 
-        end_time = time()
-        duration = end_time - start_time
+    def best_update(self):
+        """
+        The new best solution yielded by iter_run
+        :return: iteration, elapsed time, number of vehicles, distance and routes of the best solution so far
+        """
+        distance, vehicles, routes, iteration, elapsed = self.best_so_far()
+        return iteration, elapsed, vehicles, distance, routes
 
-        return helper.total_distance_list(best_solution), len(best_solution), helper.total_distance_list(
-            initial_solution), len(initial_solution), duration, best_solution
+    def update_weights(self, scores, category, rho, weighting, segment_times):
+        """
+        Void function, update the weights of the operators of a category at the end of a segment and reset the scores
+        :param scores: operator registry of the category
+        :param category: category of the operators in the telemetry
+        :param rho: reaction factor of the weights
+        :param weighting: "score" rewards the score per call, "time" rewards the score per second of the operator,
+        multiplied by the mean time of a call in the category. An operator without measured time gets its score per call
+        :param segment_times: telemetry time of each operator at the start of the segment, updated for the next one
+        """
+        times = np.zeros(len(scores))
+        for k, key in enumerate(scores.names):
+            total = self.telemetry.counter(category, key)["time"]
+            times[k] = total - segment_times.get((category, key), 0.0)
+            segment_times[(category, key)] = total
+
+        if weighting == "time":
+            calls = scores.calls.sum()
+            mean_time = times.sum() / calls if calls else 0.0
+            scores.update_weights(rho, times, mean_time)
+        else:
+            scores.update_weights(rho)
+
+    def batch_acceptance(
+            self, categories, pairs, repairs, prev_solution, best_solution, T, sigma1, sigma2, sigma3
+    ):
+        """
+        Credit every pair of a batch with its own repair, then apply the acceptance to the best feasible repair and
+        count the outcome of every pair in the telemetry. A single pair is a batch of one
+        :param categories: (removal category, insertion category) of the pairs, ("normal_cr", "ci"), ("route_cr", "ci")
+        or ("sr", "si")
+        :param pairs: list of (removal name, insertion name)
+        :param repairs: list of the repaired solutions of the pairs
+        :param prev_solution: current solution
+        :param best_solution: best solution
+        :param T: temperature
+        :return: the current and the best solutions after the acceptance
+        """
+        score_cr = self.operators[categories[0]]
+        score_ci = self.operators[categories[1]]
+        checks = [self.telemetry.evaluate(repair) for repair in repairs]
+
+        candidates = []
+        for (cr_algo, ci_algo), repair in zip(pairs, repairs):
+            if not repair.feasible:
+                continue
+            # each pair gets the credit of its own repair, compared with the current and the best solutions
+            if (
+                    len(repair) < len(best_solution) or (
+                    len(repair) == len(best_solution) and repair.distance < best_solution.distance)
+            ):
+                score_cr.credit(cr_algo, sigma1)
+                score_ci.credit(ci_algo, sigma1)
+            elif (
+                    len(repair) == len(prev_solution) and repair.distance < prev_solution.distance
+            ):
+                score_cr.credit(cr_algo, sigma2)
+                score_ci.credit(ci_algo, sigma2)
+            candidates.append((cr_algo, ci_algo, repair))
+
+        if candidates:
+            # the best feasible repair goes through the acceptance
+            cr_algo, ci_algo, repair = min(
+                candidates, key=lambda candidate: (len(candidate[2]), candidate[2].distance)
+            )
+            if (
+                    len(repair) < len(best_solution) or (
+                    len(repair) == len(best_solution) and repair.distance < best_solution.distance)
+            ):
+                prev_solution = repair
+                best_solution = repair
+
+            elif (
+                    len(repair) == len(prev_solution) and repair.distance < prev_solution.distance
+            ):
+                prev_solution = repair
+
+            elif (
+                    len(repair) == len(prev_solution) and repair.distance > prev_solution.distance
+            ):
+                prob = exp(-(repair.distance - prev_solution.distance) / T)
+                # accept the solution and update the score
+                if random() <= prob:
+                    prev_solution = repair
+                    score_cr.credit(cr_algo, sigma3)
+                    score_ci.credit(ci_algo, sigma3)
+
+        for (cr_algo, ci_algo), repair, repair_checks in zip(pairs, repairs, checks):
+            self.telemetry.outcome(
+                [(categories[0], cr_algo), (categories[1], ci_algo)], repair, prev_solution, best_solution,
+                repair_checks
+            )
+        return prev_solution, best_solution
+
+    def repair_pair(self, cr_algo, ci_algo, routes, route_removal=False, functions=None):
+        """
+        Destroy a solution with a customer or route removal and repair it with a customer insertion
+        :param cr_algo: name of the removal
+        :param ci_algo: name of the customer insertion
+        :param routes: solution
+        :param route_removal: true if the removal is a route removal
+        :param functions: dict of the function dicts of the "normal_cr", "route_cr" and "ci" categories, such as the
+        functions measured by the telemetry, the functions of the registries if None
+        :return: repaired routes
+        """
+        category = "route_cr" if route_removal else "normal_cr"
+        if functions is None:
+            cr_function = self.operators[category].function(cr_algo)
+            ci_function = self.operators["ci"].function(ci_algo)
+        else:
+            cr_function = functions[category][cr_algo]
+            ci_function = functions["ci"][ci_algo]
+        destroy = cr_function(list(routes) if route_removal else routes)
+        return ci_function(destroy, self.cr.removal)
+
+    def evaluate_pairs(self, pairs, routes, route_removal=False, functions=None):
+        """
+        Repair the same solution with each pair of operators, one after the other
+        :param pairs: list of (removal name, customer insertion name)
+        :param routes: solution
+        :param route_removal: true if the removals are route removals
+        :param functions: function dicts of the categories, see repair_pair
+        :return: list of repaired routes
+        """
+        return [self.repair_pair(cr_algo, ci_algo, routes, route_removal, functions) for cr_algo, ci_algo in pairs]
 
+    # default operators of each category, registered at the creation of the instance
     def normal_cr_function_dict(self):
         return {"r": self.cr.random_removal,
                 "wd": self.cr.worst_distance_removal,
@@ -5,33 +5,38 @@ from EVRPTW_PR_ALNS.helper_function import Helper
 
 
 class Heuristic:
-    def __init__(self, parameters):
+    def __init__(self, parameters, neighbour_k=None):
         """
         Take the parameter to initiate a helper instance
         :param parameters: parameter dict of a graph instance
+        :param neighbour_k: number of granular neighbours of a customer where it is inserted first, None to try every
+        position
         """
         self.parameters = parameters
         self.checker = MIPCheck(self.parameters)
         self.SI = StationInsertion(self.parameters)
         self.helper = Helper(self.parameters)
-        self.clients = self.parameters["clients"]
-        self.stations = self.parameters["stations"]
+        self.clients = self.parameters["client_ids"]
+        self.is_client = self.parameters["is_client"]
+        self.stations = self.parameters["station_ids"]
         self.all_nodes = self.parameters["all_nodes"]
-        self.depot_start = self.parameters["depot_start"]
-        self.depot_end = self.parameters["depot_end"]
-        self.demand = self.parameters["demand"]
-        self.ready_time = self.parameters["ready_time"]
-        self.due_date = self.parameters["due_date"]
-        self.service_time = self.parameters["service_time"]
-        self.arcs = self.parameters["arcs"]
-        self.times = self.parameters["times"]
+        self.depot_start = self.parameters["depot_start_id"]
+        self.depot_end = self.parameters["depot_end_id"]
+        self.demand = self.parameters["demand_array"].tolist()
+        self.ready_time = self.parameters["ready_time_array"].tolist()
+        self.due_date = self.parameters["due_date_array"].tolist()
+        self.service_time = self.parameters["service_time_array"].tolist()
+        self.arcs = self.parameters["distance_matrix"]
+        self.times = self.parameters["time_matrix"]
         self.final_data = self.parameters["final_data"]
-        self.original_stations = self.parameters["original_stations"]
+        self.original_stations = self.parameters["original_station_ids"]
+        self.is_original_station = self.parameters["is_original_station"]
         self.Q = self.parameters["Q"]
         self.C = self.parameters["C"]
         self.g = self.parameters["g"]
         self.h = self.parameters["h"]
         self.v = self.parameters["v"]
+        self.neighbour_k = neighbour_k
 
     def initial_solution(self):
         """
@@ -42,7 +47,7 @@ class Heuristic:
         routes = []
 
         # create the first route and add to the routes
-        route = ["D0", "D0_end"]
+        route = [self.depot_start, self.depot_end]
         routes.append(route)
 
         # create a route and add the nearest to the new route
@@ -60,20 +65,26 @@ class Heuristic:
             min_distance = 999999
             distance_record = min_distance
 
+            # the resource labels of the current route decide the feasibility of every insertion
+            labels = self.helper.route_labels(current_route)
+
             # for this part, we must find the smallest feasible if there is any
-            for client in removal:
-                for i in range(1, len(current_route)):
-                    # calculate the difference, trying to find the best one
-                    difference = self.arcs[current_route[i], client] + self.arcs[current_route[i - 1], client] - \
-                                 self.arcs[
-                                     current_route[i], current_route[i - 1]]
-                    if difference < min_distance:
-                        # find a smaller one, but check the feasibility first
-                        # if feasible, we update the recorders
-                        if self.helper.feasible_route(current_route[:i] + [client] + current_route[i:]):
-                            min_distance = difference
-                            best_insertion = client
-                            index_insertion = i
+            for neighbour_k, rest in self.helper.neighbourhoods(self.neighbour_k):
+                for client in removal:
+                    for i in self.helper.insertion_positions(current_route, client, neighbour_k, rest):
+                        # calculate the difference, trying to find the best one
+                        difference = self.arcs[current_route[i], client] + self.arcs[current_route[i - 1], client] - \
+                                     self.arcs[
+                                         current_route[i], current_route[i - 1]]
+                        if difference < min_distance:
+                            # find a smaller one, but check the feasibility first
+                            # if feasible, we update the recorders
+                            if self.helper.feasible_insertion(labels, client, i):
+                                min_distance = difference
+                                best_insertion = client
+                                index_insertion = i
+                if min_distance < distance_record:
+                    break
 
             # after this smaller search, check if the recorder has updated
             # if yes, then we find a smaller feasible customer that can be added to the route and update the current
@@ -86,13 +97,16 @@ class Heuristic:
             else:
                 # create the candidates and then compare the total distance if feasible
                 candidates = []
-                for client in removal:
-                    for i in range(1, len(current_route)):
-                        new_route = current_route[:i] + [client] + current_route[i:]
-                        # keep new route with time and cargo constraint, and use greedy station insertion to repair
-                        if self.helper.cargo_check(new_route) and self.checker.time(new_route) and not self.checker.energy(
-                                new_route):
-                            candidates.append(self.SI.greedy_station_insertion_sn(new_route))
+                for neighbour_k, rest in self.helper.neighbourhoods(self.neighbour_k):
+                    for client in removal:
+                        for i in self.helper.insertion_positions(current_route, client, neighbour_k, rest):
+                            new_route = current_route[:i] + [client] + current_route[i:]
+                            # keep new route with time and cargo constraint, and use greedy station insertion to repair
+                            if self.helper.cargo_check(new_route) and self.checker.time(new_route) and \
+                                    not self.checker.energy(new_route):
+                                candidates.append(self.SI.greedy_station_insertion_sn(new_route))
+                    if any(self.helper.feasible_route(candidate) for candidate in candidates):
+                        break
                 # when the loop finish, we proceed with the situation of all new routes
                 # if the candidates are not empty:
                 if candidates:
@@ -105,17 +119,18 @@ class Heuristic:
                         )
                         routes[-1] = add_route
                         for client in add_route:
-                            if client in self.clients and client not in current_route:
+                            if self.is_client[client] and client not in current_route:
                                 removal.remove(client)
                     else:
-                        if current_route != ["D0", "D0_end"]:
-                            routes.append(["D0", "D0_end"])
+                        if current_route != [self.depot_start, self.depot_end]:
+                            routes.append([self.depot_start, self.depot_end])
 
                         # if the new route construction is already in, meaning the infinite loop is on
                         else:
-                            routes[-1] = self.SI.supplement_station_insertion(["D0", removal[0], "D0_end"])
+                            routes[-1] = self.SI.supplement_station_insertion(
+                                [self.depot_start, removal[0], self.depot_end])
                             removal.remove(removal[0])
                 else:
                     # this is because the candidates are empty, since the route cannot meet time or cargo constraint
-                    routes.append(["D0", "D0_end"])
+                    routes.append([self.depot_start, self.depot_end])
         return routes
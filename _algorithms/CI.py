@@ -5,17 +5,37 @@ import string
 
 
 class CustomerInsertion:
-    def __init__(self, parameters):
+    def __init__(self, parameters, neighbour_k=None):
+        """
+        :param parameters: parameter dict of a graph instance
+        :param neighbour_k: number of granular neighbours of a customer where it is inserted first, None to try every
+        position
+        """
         self.parameters = parameters
         self.Q = self.parameters["Q"]
-        self.depot_start = self.parameters["depot_start"]
-        self.original_stations = self.parameters["original_stations"]
-        self.clients = self.parameters["clients"]
-        self.arcs = self.parameters["arcs"]
+        self.depot_start = self.parameters["depot_start_id"]
+        self.depot_end = self.parameters["depot_end_id"]
+        self.original_stations = self.parameters["original_station_ids"]
+        self.is_original_station = self.parameters["is_original_station"]
+        self.clients = self.parameters["client_ids"]
+        self.is_client = self.parameters["is_client"]
+        self.arcs = self.parameters["distance_matrix"]
         self.h = self.parameters["h"]
         self.checker = MIPCheck(self.parameters)
         self.helper = Helper(self.parameters)
         self.SI = StationInsertion(self.parameters)
+        self.neighbour_k = neighbour_k
+
+    def update_removal(self, removal, current_route, add_route):
+        """
+        Void function, remove the customers inserted by a repaired route from the removal list, keeping its order
+        :param removal: the customers need to be inserted
+        :param current_route: route before the repair
+        :param add_route: route after the repair
+        """
+        route_nodes = set(current_route)
+        inserted = {node for node in add_route if self.is_client[node] and node not in route_nodes}
+        removal[:] = [client for client in removal if client not in inserted]
 
     def greedy_customer_insertion(self, routes, removal):
         """
@@ -39,20 +59,26 @@ class CustomerInsertion:
             min_distance = 999999
             distance_record = min_distance
 
+            # the resource labels of the current route decide the feasibility of every insertion
+            labels = self.helper.route_labels(current_route)
+
             # for this part, we must find the smallest feasible if there is any
-            for client in removal:
-                for i in range(1, len(current_route)):
-                    # calculate the difference, trying to find the best one
-                    difference = self.arcs[current_route[i], client] + self.arcs[current_route[i - 1], client] - \
-                                 self.arcs[
-                                     current_route[i], current_route[i - 1]]
-                    if difference < min_distance:
-                        # find a smaller one, but check the feasibility first
-                        # if feasible, we update the recorders
-                        if self.helper.feasible_route(current_route[:i] + [client] + current_route[i:]):
-                            min_distance = difference
-                            best_insertion = client
-                            index_insertion = i
+            for neighbour_k, rest in self.helper.neighbourhoods(self.neighbour_k):
+                for client in removal:
+                    for i in self.helper.insertion_positions(current_route, client, neighbour_k, rest):
+                        # calculate the difference, trying to find the best one
+                        difference = self.arcs[current_route[i], client] + self.arcs[current_route[i - 1], client] - \
+                                     self.arcs[
+                                         current_route[i], current_route[i - 1]]
+                        if difference < min_distance:
+                            # find a smaller one, but check the feasibility first
+                            # if feasible, we update the recorders
+                            if self.helper.feasible_insertion(labels, client, i):
+                                min_distance = difference
+                                best_insertion = client
+                                index_insertion = i
+                if min_distance < distance_record:
+                    break
 
             # after this smaller search, check if the recorder has updated
             # if yes, then we find a smaller feasible customer that can be added to the route and update the current
@@ -67,14 +93,17 @@ class CustomerInsertion:
             else:
                 # create the candidates and then compare the total distance if feasible
                 candidates = []
-                for client in removal:
-                    for i in range(1, len(current_route)):
-                        new_route = current_route[:i] + [client] + current_route[i:]
-                        # keep new route with time and cargo constraint, and use greedy station insertion to repair
-                        if self.helper.cargo_check(new_route) and self.checker.time(
-                                new_route) and not self.checker.energy(
-                            new_route):
-                            candidates.append(self.SI.supplement_station_insertion(new_route))
+                for neighbour_k, rest in self.helper.neighbourhoods(self.neighbour_k):
+                    for client in removal:
+                        for i in self.helper.insertion_positions(current_route, client, neighbour_k, rest):
+                            new_route = current_route[:i] + [client] + current_route[i:]
+                            # keep new route with time and cargo constraint, and use greedy station insertion to repair
+                            if self.helper.cargo_check(new_route) and self.checker.time(
+                                    new_route) and not self.checker.energy(
+                                new_route):
+                                candidates.append(self.SI.supplement_station_insertion(new_route))
+                    if any(self.helper.feasible_route(candidate) for candidate in candidates):
+                        break
                 # when the loop finish, we proceed with the situation of all new routes
                 # if the candidates are not empty:
                 if candidates:
@@ -88,9 +117,7 @@ class CustomerInsertion:
                         )
                         # if after repair some can be in, we update the route, removal list and un-change the index
                         routes[route_index] = add_route
-                        for client in add_route:
-                            if client in self.clients and client not in current_route:
-                                removal.remove(client)
+                        self.update_removal(removal, current_route, add_route)
                     else:
                         # if the SI can not repair the route:
                         # if this is not the last route in the routes solution, we update to the next route
@@ -99,26 +126,27 @@ class CustomerInsertion:
 
                         # if this is the last route, we add a new route and update the route index
                         elif route_index == index_limit:
-                            routes.append(["D0", "D0_end"])
+                            routes.append([self.depot_start, self.depot_end])
                             route_index += 1
 
                         # if this is even an extra route
                         else:
                             # we first test if the current route is ["D0", "D0_end"]
                             # if the current route is not ["D0", "D0_end"], we add the new one and update the index
-                            if current_route != ["D0", "D0_end"]:
-                                routes.append(["D0", "D0_end"])
+                            if current_route != [self.depot_start, self.depot_end]:
+                                routes.append([self.depot_start, self.depot_end])
                                 route_index += 1
                             # if the current route is already ["D0", "D0_end"], we start the perfect repair
                             else:
-                                routes[route_index] = self.SI.supplement_station_insertion(["D0", removal[0], "D0_end"])
+                                routes[route_index] = self.SI.supplement_station_insertion(
+                                    [self.depot_start, removal[0], self.depot_end])
                                 removal.remove(removal[0])
                 else:
                     # this is because the candidates are empty, since the route cannot meet time or cargo constraint
                     if route_index < index_limit:
                         route_index += 1
                     else:
-                        routes.append(["D0", "D0_end"])
+                        routes.append([self.depot_start, self.depot_end])
                         route_index += 1
 
         return routes
@@ -140,29 +168,39 @@ class CustomerInsertion:
             # initiate the current route
             current_route = routes[route_index]
 
-            # store all the feasible new route after customer insertion
+            # the resource labels of the current route decide the feasibility of every insertion
+            labels = self.helper.route_labels(current_route)
+
+            # store all the feasible insertions of each customer with the increase of the distance
             customers_dict = {}
             for client in removal:
-                customer_routes = []
-                for i in range(1, len(current_route)):
-                    new_route = current_route[:i] + [client] + current_route[i:]
-                    if self.helper.feasible_route(new_route):
-                        customer_routes.append(new_route)
-                if len(customer_routes) >= k:
-                    sorted_routes = sorted(customer_routes, key=self.helper.distance_one_route)
-                    customers_dict[client] = sorted_routes
+                customer_insertions = []
+                # the positions left out by the granular neighbourhood are tried if it has fewer than k feasible ones
+                for neighbour_k, rest in self.helper.neighbourhoods(self.neighbour_k):
+                    for i in self.helper.insertion_positions(current_route, client, neighbour_k, rest):
+                        if self.helper.feasible_insertion(labels, client, i):
+                            difference = self.arcs[current_route[i], client] + \
+                                         self.arcs[current_route[i - 1], client] - \
+                                         self.arcs[current_route[i], current_route[i - 1]]
+                            customer_insertions.append((difference, i))
+                    if len(customer_insertions) >= k:
+                        break
+                if len(customer_insertions) >= k:
+                    sorted_insertions = sorted(customer_insertions, key=lambda insertion: insertion[0])
+                    customers_dict[client] = sorted_insertions
 
             # test if the dict is empty
             if customers_dict:
                 # if not empty, we can do the insertion
                 best_customer = max(
                     customers_dict,
-                    key=lambda customer: abs(self.helper.distance_one_route(
-                        customers_dict[customer][k - 1]) - self.helper.distance_one_route(customers_dict[customer][0]))
+                    key=lambda customer: abs(customers_dict[customer][k - 1][0] - customers_dict[customer][0][0])
                 )
 
-                # we insert the best customer, update the removal list
-                routes[route_index] = customers_dict[best_customer][0]
+                # we insert the best customer at its best position, update the removal list
+                index_insertion = customers_dict[best_customer][0][1]
+                new_route = current_route[:index_insertion] + [best_customer] + current_route[index_insertion:]
+                routes[route_index] = new_route
                 removal.remove(best_customer)
             else:
                 # calculate the best customer with time and cargo constraints
@@ -173,19 +211,23 @@ class CustomerInsertion:
                 distance_record = min_distance
 
                 # for this part, we must find the smallest feasible if there is any
-                for client in removal:
-                    for i in range(1, len(current_route)):
-                        # calculate the difference, trying to find the best one
-                        difference = self.arcs[current_route[i], client] + self.arcs[current_route[i - 1], client] - \
-                                     self.arcs[
-                                         current_route[i], current_route[i - 1]]
-                        if difference < min_distance:
-                            # find a smaller one, but check the feasibility first
-                            # if feasible, we update the recorders
-                            if self.helper.feasible_route(current_route[:i] + [client] + current_route[i:]):
-                                min_distance = difference
-                                best_insertion = client
-                                index_insertion = i
+                for neighbour_k, rest in self.helper.neighbourhoods(self.neighbour_k):
+                    for client in removal:
+                        for i in self.helper.insertion_positions(current_route, client, neighbour_k, rest):
+                            # calculate the difference, trying to find the best one
+                            difference = self.arcs[current_route[i], client] + \
+                                         self.arcs[current_route[i - 1], client] - \
+                                         self.arcs[
+                                             current_route[i], current_route[i - 1]]
+                            if difference < min_distance:
+                                # find a smaller one, but check the feasibility first
+                                # if feasible, we update the recorders
+                                if self.helper.feasible_insertion(labels, client, i):
+                                    min_distance = difference
+                                    best_insertion = client
+                                    index_insertion = i
+                    if min_distance < distance_record:
+                        break
 
                 # after this smaller search, check if the recorder has updated
                 # if yes, then we find a smaller feasible customer that can be added to the route and update the current
@@ -200,14 +242,18 @@ class CustomerInsertion:
                 else:
                     # create the candidates and then compare the total distance if feasible
                     candidates = []
-                    for client in removal:
-                        for i in range(1, len(current_route)):
-                            new_route = current_route[:i] + [client] + current_route[i:]
-                            # keep new route with time and cargo constraint, and use greedy station insertion to repair
-                            if self.helper.cargo_check(new_route) and self.checker.time(
-                                    new_route) and not self.checker.energy(
-                                new_route):
-                                candidates.append(self.SI.supplement_station_insertion(new_route))
+                    for neighbour_k, rest in self.helper.neighbourhoods(self.neighbour_k):
+                        for client in removal:
+                            for i in self.helper.insertion_positions(current_route, client, neighbour_k, rest):
+                                new_route = current_route[:i] + [client] + current_route[i:]
+                                # keep new route with time and cargo constraint,
+                                # and use greedy station insertion to repair
+                                if self.helper.cargo_check(new_route) and self.checker.time(
+                                        new_route) and not self.checker.energy(
+                                    new_route):
+                                    candidates.append(self.SI.supplement_station_insertion(new_route))
+                        if any(self.helper.feasible_route(candidate) for candidate in candidates):
+                            break
                     # when the loop finish, we proceed with the situation of all new routes
                     # if the candidates are not empty:
                     if candidates:
@@ -221,9 +267,7 @@ class CustomerInsertion:
                             )
                             # if after repair some can be in, we update the route, removal list and un-change the index
                             routes[route_index] = add_route
-                            for client in add_route:
-                                if client in self.clients and client not in current_route:
-                                    removal.remove(client)
+                            self.update_removal(removal, current_route, add_route)
                         else:
                             # if the SI can not repair the route:
                             # if this is not the last route in the routes solution, we update to the next route
@@ -232,27 +276,27 @@ class CustomerInsertion:
 
                             # if this is the last route, we add a new route and update the route index
                             elif route_index == index_limit:
-                                routes.append(["D0", "D0_end"])
+                                routes.append([self.depot_start, self.depot_end])
                                 route_index += 1
 
                             # if this is even an extra route
                             else:
                                 # we first test if the current route is ["D0", "D0_end"]
                                 # if the current route is not ["D0", "D0_end"], we add the new one and update the index
-                                if current_route != ["D0", "D0_end"]:
-                                    routes.append(["D0", "D0_end"])
+                                if current_route != [self.depot_start, self.depot_end]:
+                                    routes.append([self.depot_start, self.depot_end])
                                     route_index += 1
                                 # if the current route is already ["D0", "D0_end"], we start the perfect repair
                                 else:
                                     routes[route_index] = self.SI.supplement_station_insertion(
-                                        ["D0", removal[0], "D0_end"])
+                                        [self.depot_start, removal[0], self.depot_end])
                                     removal.remove(removal[0])
                     else:
                         # this is because the candidates are empty, since the route cannot meet time or cargo constraint
                         if route_index < index_limit:
                             route_index += 1
                         else:
-                            routes.append(["D0", "D0_end"])
+                            routes.append([self.depot_start, self.depot_end])
                             route_index += 1
         return routes
 
@@ -273,29 +317,39 @@ class CustomerInsertion:
             # initiate the current route
             current_route = routes[route_index]
 
-            # store all the feasible new route after customer insertion
+            # the resource labels of the current route decide the feasibility of every insertion
+            labels = self.helper.route_labels(current_route)
+
+            # store all the feasible insertions of each customer with the increase of the distance
             customers_dict = {}
             for client in removal:
-                customer_routes = []
-                for i in range(1, len(current_route)):
-                    new_route = current_route[:i] + [client] + current_route[i:]
-                    if self.helper.feasible_route(new_route):
-                        customer_routes.append(new_route)
-                if len(customer_routes) >= k:
-                    sorted_routes = sorted(customer_routes, key=self.helper.distance_one_route)
-                    customers_dict[client] = sorted_routes
+                customer_insertions = []
+                # the positions left out by the granular neighbourhood are tried if it has fewer than k feasible ones
+                for neighbour_k, rest in self.helper.neighbourhoods(self.neighbour_k):
+                    for i in self.helper.insertion_positions(current_route, client, neighbour_k, rest):
+                        if self.helper.feasible_insertion(labels, client, i):
+                            difference = self.arcs[current_route[i], client] + \
+                                         self.arcs[current_route[i - 1], client] - \
+                                         self.arcs[current_route[i], current_route[i - 1]]
+                            customer_insertions.append((difference, i))
+                    if len(customer_insertions) >= k:
+                        break
+                if len(customer_insertions) >= k:
+                    sorted_insertions = sorted(customer_insertions, key=lambda insertion: insertion[0])
+                    customers_dict[client] = sorted_insertions
 
             # test if the dict is empty
             if customers_dict:
                 # if not empty, we can do the insertion
                 best_customer = max(
                     customers_dict,
-                    key=lambda customer: abs(self.helper.distance_one_route(
-                        customers_dict[customer][k - 1]) - self.helper.distance_one_route(customers_dict[customer][0]))
+                    key=lambda customer: abs(customers_dict[customer][k - 1][0] - customers_dict[customer][0][0])
                 )
 
-                # we insert the best customer, update the removal list
-                routes[route_index] = customers_dict[best_customer][0]
+                # we insert the best customer at its best position, update the removal list
+                index_insertion = customers_dict[best_customer][0][1]
+                new_route = current_route[:index_insertion] + [best_customer] + current_route[index_insertion:]
+                routes[route_index] = new_route
                 removal.remove(best_customer)
             else:
                 # calculate the best customer with time and cargo constraints
@@ -306,19 +360,23 @@ class CustomerInsertion:
                 distance_record = min_distance
 
                 # for this part, we must find the smallest feasible if there is any
-                for client in removal:
-                    for i in range(1, len(current_route)):
-                        # calculate the difference, trying to find the best one
-                        difference = self.arcs[current_route[i], client] + self.arcs[current_route[i - 1], client] - \
-                                     self.arcs[
-                                         current_route[i], current_route[i - 1]]
-                        if difference < min_distance:
-                            # find a smaller one, but check the feasibility first
-                            # if feasible, we update the recorders
-                            if self.helper.feasible_route(current_route[:i] + [client] + current_route[i:]):
-                                min_distance = difference
-                                best_insertion = client
-                                index_insertion = i
+                for neighbour_k, rest in self.helper.neighbourhoods(self.neighbour_k):
+                    for client in removal:
+                        for i in self.helper.insertion_positions(current_route, client, neighbour_k, rest):
+                            # calculate the difference, trying to find the best one
+                            difference = self.arcs[current_route[i], client] + \
+                                         self.arcs[current_route[i - 1], client] - \
+                                         self.arcs[
+                                             current_route[i], current_route[i - 1]]
+                            if difference < min_distance:
+                                # find a smaller one, but check the feasibility first
+                                # if feasible, we update the recorders
+                                if self.helper.feasible_insertion(labels, client, i):
+                                    min_distance = difference
+                                    best_insertion = client
+                                    index_insertion = i
+                    if min_distance < distance_record:
+                        break
 
                 # after this smaller search, check if the recorder has updated
                 # if yes, then we find a smaller feasible customer that can be added to the route and update the current
@@ -333,14 +391,18 @@ class CustomerInsertion:
                 else:
                     # create the candidates and then compare the total distance if feasible
                     candidates = []
-                    for client in removal:
-                        for i in range(1, len(current_route)):
-                            new_route = current_route[:i] + [client] + current_route[i:]
-                            # keep new route with time and cargo constraint, and use greedy station insertion to repair
-                            if self.helper.cargo_check(new_route) and self.checker.time(
-                                    new_route) and not self.checker.energy(
-                                new_route):
-                                candidates.append(self.SI.supplement_station_insertion(new_route))
+                    for neighbour_k, rest in self.helper.neighbourhoods(self.neighbour_k):
+                        for client in removal:
+                            for i in self.helper.insertion_positions(current_route, client, neighbour_k, rest):
+                                new_route = current_route[:i] + [client] + current_route[i:]
+                                # keep new route with time and cargo constraint,
+                                # and use greedy station insertion to repair
+                                if self.helper.cargo_check(new_route) and self.checker.time(
+                                        new_route) and not self.checker.energy(
+                                    new_route):
+                                    candidates.append(self.SI.supplement_station_insertion(new_route))
+                        if any(self.helper.feasible_route(candidate) for candidate in candidates):
+                            break
                     # when the loop finish, we proceed with the situation of all new routes
                     # if the candidates are not empty:
                     if candidates:
@@ -354,9 +416,7 @@ class CustomerInsertion:
                             )
                             # if after repair some can be in, we update the route, removal list and un-change the index
                             routes[route_index] = add_route
-                            for client in add_route:
-                                if client in self.clients and client not in current_route:
-                                    removal.remove(client)
+                            self.update_removal(removal, current_route, add_route)
                         else:
                             # if the SI can not repair the route:
                             # if this is not the last route in the routes solution, we update to the next route
@@ -365,26 +425,26 @@ class CustomerInsertion:
 
                             # if this is the last route, we add a new route and update the route index
                             elif route_index == index_limit:
-                                routes.append(["D0", "D0_end"])
+                                routes.append([self.depot_start, self.depot_end])
                                 route_index += 1
 
                             # if this is even an extra route
                             else:
                                 # we first test if the current route is ["D0", "D0_end"]
                                 # if the current route is not ["D0", "D0_end"], we add the new one and update the index
-                                if current_route != ["D0", "D0_end"]:
-                                    routes.append(["D0", "D0_end"])
+                                if current_route != [self.depot_start, self.depot_end]:
+                                    routes.append([self.depot_start, self.depot_end])
                                     route_index += 1
                                 # if the current route is already ["D0", "D0_end"], we start the perfect repair
                                 else:
                                     routes[route_index] = self.SI.supplement_station_insertion(
-                                        ["D0", removal[0], "D0_end"])
+                                        [self.depot_start, removal[0], self.depot_end])
                                     removal.remove(removal[0])
                     else:
                         # this is because the candidates are empty, since the route cannot meet time or cargo constraint
                         if route_index < index_limit:
                             route_index += 1
                         else:
-                            routes.append(["D0", "D0_end"])
+                            routes.append([self.depot_start, self.depot_end])
                             route_index += 1
         return routes
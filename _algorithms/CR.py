@@ -1,9 +1,9 @@
 from EVRPTW_PR_ALNS.mip_check import MIPCheck
 from EVRPTW_PR_ALNS.helper_function import Helper
+from EVRPTW_PR_ALNS.solution import Solution
 from math import ceil, floor
-from random import uniform, sample, random
-from copy import deepcopy
 import numpy as np
+from random import uniform, sample, random
 
 
 class CustomerRemoval:
@@ -15,20 +15,22 @@ class CustomerRemoval:
         self.parameters = parameters
         self.checker = MIPCheck(self.parameters)
         self.helper = Helper(self.parameters)
-        self.clients = self.parameters["clients"]
-        self.stations = self.parameters["stations"]
+        self.clients = self.parameters["client_ids"]
+        self.is_client = self.parameters["is_client"]
+        self.stations = self.parameters["station_ids"]
         self.all_nodes = self.parameters["all_nodes"]
-        self.depot_start = self.parameters["depot_start"]
-        self.depot_end = self.parameters["depot_end"]
-        self.demand = self.parameters["demand"]
-        self.ready_time = self.parameters["ready_time"]
-        self.due_date = self.parameters["due_date"]
-        self.service_time = self.parameters["service_time"]
-        self.arcs = self.parameters["arcs"]
-        self.times = self.parameters["times"]
+        self.depot_start = self.parameters["depot_start_id"]
+        self.depot_end = self.parameters["depot_end_id"]
+        self.demand = self.parameters["demand_array"].tolist()
+        self.ready_time = self.parameters["ready_time_array"].tolist()
+        self.due_date = self.parameters["due_date_array"].tolist()
+        self.service_time = self.parameters["service_time_array"].tolist()
+        self.arcs = self.parameters["distance_matrix"]
+        self.times = self.parameters["time_matrix"]
         self.final_data = self.parameters["final_data"]
-        self.original_stations = self.parameters["original_stations"]
-        self.locations = self.parameters["locations"]
+        self.original_stations = self.parameters["original_station_ids"]
+        self.is_original_station = self.parameters["is_original_station"]
+        self.locations = self.parameters["coordinates"].tolist()
         self.Q = self.parameters["Q"]
         self.C = self.parameters["C"]
         self.g = self.parameters["g"]
@@ -47,6 +49,13 @@ class CustomerRemoval:
         self.mr = 0.3
         self.increment = 15
         self.removal = []
+        # rank of each client in the shaw matrices, -1 for the other nodes
+        self.client_rank = np.full(len(self.is_client), -1)
+        self.client_rank[self.clients] = np.arange(len(self.clients))
+        # static part of the shaw relatedness, keyed by (phi1, phi2, phi4)
+        self.shaw_matrices = {}
+        # the zones holding at least one client and their clients, for the zone removals
+        self.zones, self.zone_clients = self.build_zones()
 
     def reset_removal(self):
         """
@@ -54,6 +63,35 @@ class CustomerRemoval:
         """
         self.removal = []
 
+    def remove_customers(self, routes, station_offset=0):
+        """
+        Remove the customers of the removal list from the routes, copy on write
+        Only the routes containing a removed customer are copied, the other route lists are shared with the argument
+        and must not be modified in place
+        :param routes: solution, the client index of a Solution finds the removed customers without scanning the routes
+        :param station_offset: -1 (1) to also remove the station right before (after) a removed customer, 0 for none
+        :return: new list of routes
+        """
+        if not isinstance(routes, Solution):
+            routes = Solution(self.helper, routes)
+
+        # group the positions to remove by route
+        removal_index = {}
+        for client in self.removal:
+            location = routes.locate(client)
+            if location is None:
+                continue
+            i, j = location
+            remove_index = removal_index.setdefault(i, set())
+            remove_index.add(j)
+            if station_offset and self.is_original_station[routes[i][j + station_offset]]:
+                remove_index.add(j + station_offset)
+
+        routes_removal = list(routes)
+        for i, remove_index in removal_index.items():
+            routes_removal[i] = [node for j, node in enumerate(routes[i]) if j not in remove_index]
+        return routes_removal
+
     def random_removal(self, routes):
         """
         This is the function to randomly remove customers from the feasible solution
@@ -66,17 +104,8 @@ class CustomerRemoval:
         gamma = ceil(uniform(self.removal_lower, self.removal_upper))
         # use sample to update the removal list, containing the customers to be removed
         self.removal = sample(self.clients, gamma)
-        # deep copy the routes for list change
-        routes_removal = deepcopy(routes)
-
-        # traverse the feasible solution row by row
-        # for each route in the routes, for each client in removal list, if the client in, remove
-        for i in range(len(routes)):
-            for client in self.removal:
-                if client in routes[i]:
-                    routes_removal[i].remove(client)
-        # return the routes after removing all the clients
-        return routes_removal
+        # remove the customers, the routes without any of them are shared with the argument
+        return self.remove_customers(routes)
 
     def random_removal_prev(self, routes):
         """
@@ -91,20 +120,8 @@ class CustomerRemoval:
         # use sample to update the removal list, containing the customers to be removed
         self.removal = sample(self.clients, gamma)
 
-        new_routes = []
-
-        for i in range(len(routes)):
-            arr = np.array(routes[i])
-            remove_index = []
-            for j in range(len(routes[i])):
-                if routes[i][j] in self.removal:
-                    remove_index.append(j)
-                    if routes[i][j - 1] in self.original_stations:
-                        remove_index.append(j - 1)
-            new_arr = np.delete(arr, remove_index)
-            new_route = new_arr.tolist()
-            new_routes.append(new_route)
-        return new_routes
+        # remove the customers together with the station right before them
+        return self.remove_customers(routes, station_offset=-1)
 
     def random_removal_next(self, routes):
         # reset the removal list to be empty again
@@ -114,20 +131,8 @@ class CustomerRemoval:
         # use sample to update the removal list, containing the customers to be removed
         self.removal = sample(self.clients, gamma)
 
-        new_routes = []
-
-        for i in range(len(routes)):
-            arr = np.array(routes[i])
-            remove_index = []
-            for j in range(len(routes[i])):
-                if routes[i][j] in self.removal:
-                    remove_index.append(j)
-                    if routes[i][j + 1] in self.original_stations:
-                        remove_index.append(j + 1)
-            new_arr = np.delete(arr, remove_index)
-            new_route = new_arr.tolist()
-            new_routes.append(new_route)
-        return new_routes
+        # remove the customers together with the station right after them
+        return self.remove_customers(routes, station_offset=1)
 
     def worst_distance_removal(self, routes):
         # reset the removal list to be empty again
@@ -140,7 +145,7 @@ class CustomerRemoval:
 
         for route in routes:
             for i in range(len(route)):
-                if route[i] in self.clients:
+                if self.is_client[route[i]]:
                     distance_cost[route[i]] = self.arcs[route[i], route[i - 1]] + self.arcs[route[i], route[i + 1]]
 
         # sort the dict according to the descending order
@@ -157,17 +162,8 @@ class CustomerRemoval:
             else:
                 self.removal.append(sorted_customers[index])
 
-        # after get the removal list, we can remove the customers, same procedure as the random removal
-        routes_removal = deepcopy(routes)
-
-        # traverse the feasible solution row by row
-        # for each route in the routes, for each client in removal list, if the client in, remove
-        for i in range(len(routes)):
-            for client in self.removal:
-                if client in routes[i]:
-                    routes_removal[i].remove(client)
-        # return the routes after removing all the clients
-        return routes_removal
+        # remove the customers, the routes without any of them are shared with the argument
+        return self.remove_customers(routes)
 
     def worst_distance_removal_prev(self, routes):
         # reset the removal list to be empty again
@@ -180,7 +176,7 @@ class CustomerRemoval:
 
         for route in routes:
             for i in range(len(route)):
-                if route[i] in self.clients:
+                if self.is_client[route[i]]:
                     distance_cost[route[i]] = self.arcs[route[i], route[i - 1]] + self.arcs[route[i], route[i + 1]]
 
         # sort the dict according to the descending order
@@ -197,20 +193,8 @@ class CustomerRemoval:
             else:
                 self.removal.append(sorted_customers[index])
 
-        new_routes = []
-
-        for i in range(len(routes)):
-            arr = np.array(routes[i])
-            remove_index = []
-            for j in range(len(routes[i])):
-                if routes[i][j] in self.removal:
-                    remove_index.append(j)
-                    if routes[i][j - 1] in self.original_stations:
-                        remove_index.append(j - 1)
-            new_arr = np.delete(arr, remove_index)
-            new_route = new_arr.tolist()
-            new_routes.append(new_route)
-        return new_routes
+        # remove the customers together with the station right before them
+        return self.remove_customers(routes, station_offset=-1)
 
     def worst_distance_removal_next(self, routes):
         # reset the removal list to be empty again
@@ -223,7 +207,7 @@ class CustomerRemoval:
 
         for route in routes:
             for i in range(len(route)):
-                if route[i] in self.clients:
+                if self.is_client[route[i]]:
                     distance_cost[route[i]] = self.arcs[route[i], route[i - 1]] + self.arcs[route[i], route[i + 1]]
 
         # sort the dict according to the descending order
@@ -240,20 +224,8 @@ class CustomerRemoval:
             else:
                 self.removal.append(sorted_customers[index])
 
-        new_routes = []
-
-        for i in range(len(routes)):
-            arr = np.array(routes[i])
-            remove_index = []
-            for j in range(len(routes[i])):
-                if routes[i][j] in self.removal:
-                    remove_index.append(j)
-                    if routes[i][j + 1] in self.original_stations:
-                        remove_index.append(j + 1)
-            new_arr = np.delete(arr, remove_index)
-            new_route = new_arr.tolist()
-            new_routes.append(new_route)
-        return new_routes
+        # remove the customers together with the station right after them
+        return self.remove_customers(routes, station_offset=1)
 
     def worst_time_removal(self, routes):
         # reset the removal list to be empty again
@@ -268,7 +240,7 @@ class CustomerRemoval:
             # for each route, extract the one to one corresponding arrival time
             arrival_time = self.checker.time_extractor(route)
             for i in range(len(route)):
-                if route[i] in self.clients:
+                if self.is_client[route[i]]:
                     time_cost[route[i]] = abs(arrival_time[i] - self.ready_time[route[i]])
 
         # sort the dict according to the descending order
@@ -285,17 +257,8 @@ class CustomerRemoval:
             else:
                 self.removal.append(sorted_customers[index])
 
-        # after get the removal list, we can remove the customers, same procedure as the random removal
-        routes_removal = deepcopy(routes)
-
-        # traverse the feasible solution row by row
-        # for each route in the routes, for each client in removal list, if the client in, remove
-        for i in range(len(routes)):
-            for client in self.removal:
-                if client in routes[i]:
-                    routes_removal[i].remove(client)
-        # return the routes after removing all the clients
-        return routes_removal
+        # remove the customers, the routes without any of them are shared with the argument
+        return self.remove_customers(routes)
 
     def worst_time_removal_prev(self, routes):
         # reset the removal list to be empty again
@@ -310,7 +273,7 @@ class CustomerRemoval:
             # for each route, extract the one to one corresponding arrival time
             arrival_time = self.checker.time_extractor(route)
             for i in range(len(route)):
-                if route[i] in self.clients:
+                if self.is_client[route[i]]:
                     time_cost[route[i]] = abs(arrival_time[i] - self.ready_time[route[i]])
 
         # sort the dict according to the descending order
@@ -327,20 +290,8 @@ class CustomerRemoval:
             else:
                 self.removal.append(sorted_customers[index])
 
-        new_routes = []
-
-        for i in range(len(routes)):
-            arr = np.array(routes[i])
-            remove_index = []
-            for j in range(len(routes[i])):
-                if routes[i][j] in self.removal:
-                    remove_index.append(j)
-                    if routes[i][j - 1] in self.original_stations:
-                        remove_index.append(j - 1)
-            new_arr = np.delete(arr, remove_index)
-            new_route = new_arr.tolist()
-            new_routes.append(new_route)
-        return new_routes
+        # remove the customers together with the station right before them
+        return self.remove_customers(routes, station_offset=-1)
 
     def worst_time_removal_next(self, routes):
         # reset the removal list to be empty again
@@ -355,7 +306,7 @@ class CustomerRemoval:
             # for each route, extract the one to one corresponding arrival time
             arrival_time = self.checker.time_extractor(route)
             for i in range(len(route)):
-                if route[i] in self.clients:
+                if self.is_client[route[i]]:
                     time_cost[route[i]] = abs(arrival_time[i] - self.ready_time[route[i]])
 
         # sort the dict according to the descending order
@@ -372,20 +323,8 @@ class CustomerRemoval:
             else:
                 self.removal.append(sorted_customers[index])
 
-        new_routes = []
-
-        for i in range(len(routes)):
-            arr = np.array(routes[i])
-            remove_index = []
-            for j in range(len(routes[i])):
-                if routes[i][j] in self.removal:
-                    remove_index.append(j)
-                    if routes[i][j + 1] in self.original_stations:
-                        remove_index.append(j + 1)
-            new_arr = np.delete(arr, remove_index)
-            new_route = new_arr.tolist()
-            new_routes.append(new_route)
-        return new_routes
+        # remove the customers together with the station right after them
+        return self.remove_customers(routes, station_offset=1)
 
     def worst_energy_removal(self, routes):
         # reset the removal list to be empty again
@@ -400,7 +339,7 @@ class CustomerRemoval:
             # for each route, extract the one to one corresponding arrival time
             departure_energy = self.checker.energy_extractor(route)
             for i in range(len(route)):
-                if route[i] in self.clients:
+                if self.is_client[route[i]]:
                     energy_cost[route[i]] = departure_energy[i]
 
         # sort the dict according to the increasing order, since when the smaller is the energy, more is the cost
@@ -417,17 +356,8 @@ class CustomerRemoval:
             else:
                 self.removal.append(sorted_customers[index])
 
-        # after get the removal list, we can remove the customers, same procedure as the random removal
-        routes_removal = deepcopy(routes)
-
-        # traverse the feasible solution row by row
-        # for each route in the routes, for each client in removal list, if the client in, remove
-        for i in range(len(routes)):
-            for client in self.removal:
-                if client in routes[i]:
-                    routes_removal[i].remove(client)
-        # return the routes after removing all the clients
-        return routes_removal
+        # remove the customers, the routes without any of them are shared with the argument
+        return self.remove_customers(routes)
 
     def worst_energy_removal_prev(self, routes):
         # reset the removal list to be empty again
@@ -442,7 +372,7 @@ class CustomerRemoval:
             # for each route, extract the one to one corresponding arrival time
             departure_energy = self.checker.energy_extractor(route)
             for i in range(len(route)):
-                if route[i] in self.clients:
+                if self.is_client[route[i]]:
                     energy_cost[route[i]] = departure_energy[i]
 
         # sort the dict according to the increasing order, since when the smaller is the energy, more is the cost
@@ -459,20 +389,8 @@ class CustomerRemoval:
             else:
                 self.removal.append(sorted_customers[index])
 
-        new_routes = []
-
-        for i in range(len(routes)):
-            arr = np.array(routes[i])
-            remove_index = []
-            for j in range(len(routes[i])):
-                if routes[i][j] in self.removal:
-                    remove_index.append(j)
-                    if routes[i][j - 1] in self.original_stations:
-                        remove_index.append(j - 1)
-            new_arr = np.delete(arr, remove_index)
-            new_route = new_arr.tolist()
-            new_routes.append(new_route)
-        return new_routes
+        # remove the customers together with the station right before them
+        return self.remove_customers(routes, station_offset=-1)
 
     def worst_energy_removal_next(self, routes):
         # reset the removal list to be empty again
@@ -487,7 +405,7 @@ class CustomerRemoval:
             # for each route, extract the one to one corresponding arrival time
             departure_energy = self.checker.energy_extractor(route)
             for i in range(len(route)):
-                if route[i] in self.clients:
+                if self.is_client[route[i]]:
                     energy_cost[route[i]] = departure_energy[i]
 
         # sort the dict according to the increasing order, since when the smaller is the energy, more is the cost
@@ -504,20 +422,58 @@ class CustomerRemoval:
             else:
                 self.removal.append(sorted_customers[index])
 
-        new_routes = []
-
-        for i in range(len(routes)):
-            arr = np.array(routes[i])
-            remove_index = []
-            for j in range(len(routes[i])):
-                if routes[i][j] in self.removal:
-                    remove_index.append(j)
-                    if routes[i][j + 1] in self.original_stations:
-                        remove_index.append(j + 1)
-            new_arr = np.delete(arr, remove_index)
-            new_route = new_arr.tolist()
-            new_routes.append(new_route)
-        return new_routes
+        # remove the customers together with the station right after them
+        return self.remove_customers(routes, station_offset=1)
+
+    def shaw_relatedness(self, phi1, phi2, phi4):
+        """
+        The part of the shaw relatedness that does not depend on the solution, computed once for each set of weights
+        :return: phi1 * dij + phi2 * |ei - ej| and phi4 * |ui - uj|, matrices indexed by the client ranks
+        """
+        key = (phi1, phi2, phi4)
+        if key not in self.shaw_matrices:
+            clients = np.array(self.clients)
+            ready_time = self.parameters["ready_time_array"][clients]
+            demand = self.parameters["demand_array"][clients]
+            self.shaw_matrices[key] = (
+                phi1 * self.arcs[np.ix_(clients, clients)] + phi2 * np.abs(np.subtract.outer(ready_time, ready_time)),
+                phi4 * np.abs(np.subtract.outer(demand, demand))
+            )
+        return self.shaw_matrices[key]
+
+    def shaw_sorted_customers(self, routes, chosen, gamma, phi1, phi2, phi3, phi4):
+        """
+        Sort the customers of the solution by their relatedness with the chosen one
+        :param routes: solution
+        :param chosen: the customer removed first
+        :param gamma: number of customers to be removed, only the gamma most related are sorted
+        :return: list of the most related customers, the ties keep the order of the solution
+        """
+        distance_time, demand = self.shaw_relatedness(phi1, phi2, phi4)
+
+        # the other customers in the order of the solution, and the mask of those in the same route as the chosen
+        customers = []
+        same_route = []
+        for route in routes:
+            shared = chosen in route
+            for node in route:
+                if self.is_client[node] and node != chosen:
+                    customers.append(node)
+                    same_route.append(shared)
+
+        ranks = self.client_rank[customers]
+        row = self.client_rank[chosen]
+        # lij is -1 if nodes i and j are in the same route, 1 otherwise
+        relatedness = (distance_time[row, ranks] + np.where(same_route, -phi3, phi3)) + demand[row, ranks]
+
+        # select the gamma smallest values, the ties with the last one are kept to be sorted in order as well
+        if gamma < len(customers):
+            kth = relatedness[np.argpartition(relatedness, gamma - 1)[gamma - 1]]
+            candidates = np.flatnonzero(relatedness <= kth)
+        else:
+            candidates = np.arange(len(customers))
+        order = candidates[np.argsort(relatedness[candidates], kind="stable")]
+        return [customers[k] for k in order[:gamma]]
 
     def shaw_removal(self, routes, phi1=5, phi2=1, phi3=13, phi4=0.25):
         """
@@ -535,30 +491,9 @@ class CustomerRemoval:
         self.removal = sample(self.clients, 1)
         chosen = self.removal[0]
 
-        # create a similarity dict to contain all the relatedness between the chosen and the other customers
-        similarity = {}
-
-        # first traverse each route in the solution and check if the customer and the chosen one are in the same route
-        # for each route in the solution
-        for route in routes:
-            # for each node in the route if the node is a client, check if the chosen one is also in
-            # also check if they are the same node, if yes, nothing to operate
-            for node in route:
-                if node in self.clients and chosen in route and node != chosen:
-                    similarity[node] = (
-                            phi1 * self.arcs[node, chosen] + phi2 * abs(
-                        self.ready_time[node] - self.ready_time[chosen]) - phi3 + phi4 * abs(
-                        self.demand[node] - self.demand[chosen])
-                    )
-                if node in self.clients and chosen not in route:
-                    similarity[node] = (
-                            phi1 * self.arcs[node, chosen] + phi2 * abs(
-                        self.ready_time[node] - self.ready_time[chosen]) + phi3 + phi4 * abs(
-                        self.demand[node] - self.demand[chosen])
-                    )
-
-        # sort the dict according to the increasing order, since we want to remove similar nodes
-        sorted_customers = sorted(similarity, key=similarity.get)
+        # sort the other customers according to the increasing order of relatedness, since we want to remove similar
+        # nodes, only the gamma first ones can be chosen
+        sorted_customers = self.shaw_sorted_customers(routes, chosen, gamma, phi1, phi2, phi3, phi4)
 
         # start to update the removal list and remove the customers
         while len(self.removal) < gamma:
@@ -571,17 +506,8 @@ class CustomerRemoval:
             else:
                 self.removal.append(sorted_customers[index])
 
-        # after get the removal list, we can remove the customers, same procedure as the random removal
-        routes_removal = deepcopy(routes)
-
-        # traverse the feasible solution row by row
-        # for each route in the routes, for each client in removal list, if the client in, remove
-        for i in range(len(routes)):
-            for client in self.removal:
-                if client in routes[i]:
-                    routes_removal[i].remove(client)
-        # return the routes after removing all the clients
-        return routes_removal
+        # remove the customers, the routes without any of them are shared with the argument
+        return self.remove_customers(routes)
 
     def shaw_removal_prev(self, routes, phi1=0.5, phi2=13, phi3=0.15, phi4=0.25):
         # reset the removal list to empty again
@@ -594,30 +520,9 @@ class CustomerRemoval:
         self.removal = sample(self.clients, 1)
         chosen = self.removal[0]
 
-        # create a similarity dict to contain all the relatedness between the chosen and the other customers
-        similarity = {}
-
-        # first traverse each route in the solution and check if the customer and the chosen one are in the same route
-        # for each route in the solution
-        for route in routes:
-            # for each node in the route if the node is a client, check if the chosen one is also in
-            # also check if they are the same node, if yes, nothing to operate
-            for node in route:
-                if node in self.clients and chosen in route and node != chosen:
-                    similarity[node] = (
-                            phi1 * self.arcs[node, chosen] + phi2 * abs(
-                        self.ready_time[node] - self.ready_time[chosen]) - phi3 + phi4 * abs(
-                        self.demand[node] - self.demand[chosen])
-                    )
-                if node in self.clients and chosen not in route:
-                    similarity[node] = (
-                            phi1 * self.arcs[node, chosen] + phi2 * abs(
-                        self.ready_time[node] - self.ready_time[chosen]) + phi3 + phi4 * abs(
-                        self.demand[node] - self.demand[chosen])
-                    )
-
-        # sort the dict according to the increasing order, since we want to remove similar nodes
-        sorted_customers = sorted(similarity, key=similarity.get)
+        # sort the other customers according to the increasing order of relatedness, since we want to remove similar
+        # nodes, only the gamma first ones can be chosen
+        sorted_customers = self.shaw_sorted_customers(routes, chosen, gamma, phi1, phi2, phi3, phi4)
 
         # start to update the removal list and remove the customers
         while len(self.removal) < gamma:
@@ -630,20 +535,8 @@ class CustomerRemoval:
             else:
                 self.removal.append(sorted_customers[index])
 
-        new_routes = []
-
-        for i in range(len(routes)):
-            arr = np.array(routes[i])
-            remove_index = []
-            for j in range(len(routes[i])):
-                if routes[i][j] in self.removal:
-                    remove_index.append(j)
-                    if routes[i][j - 1] in self.original_stations:
-                        remove_index.append(j - 1)
-            new_arr = np.delete(arr, remove_index)
-            new_route = new_arr.tolist()
-            new_routes.append(new_route)
-        return new_routes
+        # remove the customers together with the station right before them
+        return self.remove_customers(routes, station_offset=-1)
 
     def shaw_removal_next(self, routes, phi1=0.5, phi2=13, phi3=0.15, phi4=0.25):
         # reset the removal list to empty again
@@ -656,30 +549,9 @@ class CustomerRemoval:
         self.removal = sample(self.clients, 1)
         chosen = self.removal[0]
 
-        # create a similarity dict to contain all the relatedness between the chosen and the other customers
-        similarity = {}
-
-        # first traverse each route in the solution and check if the customer and the chosen one are in the same route
-        # for each route in the solution
-        for route in routes:
-            # for each node in the route if the node is a client, check if the chosen one is also in
-            # also check if they are the same node, if yes, nothing to operate
-            for node in route:
-                if node in self.clients and chosen in route and node != chosen:
-                    similarity[node] = (
-                            phi1 * self.arcs[node, chosen] + phi2 * abs(
-                        self.ready_time[node] - self.ready_time[chosen]) - phi3 + phi4 * abs(
-                        self.demand[node] - self.demand[chosen])
-                    )
-                if node in self.clients and chosen not in route:
-                    similarity[node] = (
-                            phi1 * self.arcs[node, chosen] + phi2 * abs(
-                        self.ready_time[node] - self.ready_time[chosen]) + phi3 + phi4 * abs(
-                        self.demand[node] - self.demand[chosen])
-                    )
-
-        # sort the dict according to the increasing order, since we want to remove similar nodes
-        sorted_customers = sorted(similarity, key=similarity.get)
+        # sort the other customers according to the increasing order of relatedness, since we want to remove similar
+        # nodes, only the gamma first ones can be chosen
+        sorted_customers = self.shaw_sorted_customers(routes, chosen, gamma, phi1, phi2, phi3, phi4)
 
         # start to update the removal list and remove the customers
         while len(self.removal) < gamma:
@@ -692,20 +564,8 @@ class CustomerRemoval:
             else:
                 self.removal.append(sorted_customers[index])
 
-        new_routes = []
-
-        for i in range(len(routes)):
-            arr = np.array(routes[i])
-            remove_index = []
-            for j in range(len(routes[i])):
-                if routes[i][j] in self.removal:
-                    remove_index.append(j)
-                    if routes[i][j + 1] in self.original_stations:
-                        remove_index.append(j + 1)
-            new_arr = np.delete(arr, remove_index)
-            new_route = new_arr.tolist()
-            new_routes.append(new_route)
-        return new_routes
+        # remove the customers together with the station right after them
+        return self.remove_customers(routes, station_offset=1)
 
     def proximity_removal(self, routes):
         """
@@ -743,152 +603,77 @@ class CustomerRemoval:
     def demand_removal_next(self, routes):
         return self.shaw_removal_next(routes, phi1=0, phi2=0, phi3=0, phi4=1)
 
-    def zone_removal(self, routes):
+    def build_zones(self):
         """
-        This is the function to remove a bunch of customers in the same zone
+        Split the graph into zones based on the coordinates and find the clients inside each zone
+        :return: list of zones (x lower, x upper, y lower, y upper) and list of their clients, empty zones excluded
         """
-        # reset the removal list
-        self.reset_removal()
-
         # find the bound of the all the graph (not only customers, but all nodes)
-        x_lower = min(values[0] for location, values in self.locations.items())
-        x_upper = max(values[0] for location, values in self.locations.items())
-        y_lower = min(values[1] for location, values in self.locations.items())
-        y_upper = max(values[1] for location, values in self.locations.items())
+        x_lower = min(values[0] for values in self.locations)
+        x_upper = max(values[0] for values in self.locations)
+        y_lower = min(values[1] for values in self.locations)
+        y_upper = max(values[1] for values in self.locations)
 
         # split into smaller zones based on the coordinates
         # first decide the increments
         x_increment = (ceil(x_upper) - floor(x_lower)) / self.increment
         y_increment = (ceil(y_upper) - floor(y_lower)) / self.increment
 
-        zones = []
+        clients = np.array(self.clients)
+        x = self.parameters["coordinates"][clients, 0]
+        y = self.parameters["coordinates"][clients, 1]
 
+        zones = []
+        zone_clients = []
         for i in range(floor(x_lower), ceil(x_upper), ceil(x_increment)):
             for j in range(floor(y_lower), ceil(y_upper), ceil(y_increment)):
-                zones.append((i, i + x_increment, j, j + y_increment))
+                inside = (i <= x) & (x <= i + x_increment) & (j <= y) & (y <= j + y_increment)
+                # a zone without customer can never be removed, so it is not kept
+                if inside.any():
+                    zones.append((i, i + x_increment, j, j + y_increment))
+                    zone_clients.append(clients[inside].tolist())
+        return zones, zone_clients
+
+    def zone_customers(self, routes):
+        """
+        Void function, randomly select a zone and put the customers served inside in the removal list
+        :param routes: solution
+        """
+        if not isinstance(routes, Solution):
+            routes = Solution(self.helper, routes)
 
-        # randomly select a zone and remove the customers inside, if the zone has no customer, continue to next
+        # randomly select a zone, the clients are kept in the order of the solution
         while not self.removal:
-            removal_zone = sample(zones, 1)
-
-            for route in routes:
-                for node in route:
-                    if (
-                            node in self.clients and removal_zone[0][0] <= self.locations[node][0] <= removal_zone[0][
-                        1] and
-                            removal_zone[0][2] <= self.locations[node][1] <= removal_zone[0][3]
-                    ):
-                        self.removal.append(node)
-
-        # after get the removal list, we can remove the customers, same procedure as the random removal
-        routes_removal = deepcopy(routes)
-
-        # traverse the feasible solution row by row
-        # for each route in the routes, for each client in removal list, if the client in, remove
-        for i in range(len(routes)):
-            for client in self.removal:
-                if client in routes[i]:
-                    routes_removal[i].remove(client)
-        # return the routes after removing all the clients
-        return routes_removal
+            zone_clients = sample(self.zone_clients, 1)[0]
+            served = [client for client in zone_clients if routes.locate(client) is not None]
+            self.removal = sorted(served, key=routes.locate)
 
-    def zone_removal_prev(self, routes):
+    def zone_removal(self, routes):
+        """
+        This is the function to remove a bunch of customers in the same zone
+        """
         # reset the removal list
         self.reset_removal()
+        self.zone_customers(routes)
 
-        # find the bound of the all the graph (not only customers, but all nodes)
-        x_lower = min(values[0] for location, values in self.locations.items())
-        x_upper = max(values[0] for location, values in self.locations.items())
-        y_lower = min(values[1] for location, values in self.locations.items())
-        y_upper = max(values[1] for location, values in self.locations.items())
+        # remove the customers, the routes without any of them are shared with the argument
+        return self.remove_customers(routes)
 
-        # split into smaller zones based on the coordinates
-        # first decide the increments
-        x_increment = (ceil(x_upper) - floor(x_lower)) / self.increment
-        y_increment = (ceil(y_upper) - floor(y_lower)) / self.increment
-
-        zones = []
-
-        for i in range(floor(x_lower), ceil(x_upper), ceil(x_increment)):
-            for j in range(floor(y_lower), ceil(y_upper), ceil(y_increment)):
-                zones.append((i, i + x_increment, j, j + y_increment))
+    def zone_removal_prev(self, routes):
+        # reset the removal list
+        self.reset_removal()
+        self.zone_customers(routes)
 
-        # randomly select a zone and remove the customers inside, if the zone has no customer, continue to next
-        while not self.removal:
-            removal_zone = sample(zones, 1)
-
-            for route in routes:
-                for node in route:
-                    if (
-                            node in self.clients and removal_zone[0][0] <= self.locations[node][0] <= removal_zone[0][
-                        1] and
-                            removal_zone[0][2] <= self.locations[node][1] <= removal_zone[0][3]
-                    ):
-                        self.removal.append(node)
-
-        new_routes = []
-
-        for i in range(len(routes)):
-            arr = np.array(routes[i])
-            remove_index = []
-            for j in range(len(routes[i])):
-                if routes[i][j] in self.removal:
-                    remove_index.append(j)
-                    if routes[i][j - 1] in self.original_stations:
-                        remove_index.append(j - 1)
-            new_arr = np.delete(arr, remove_index)
-            new_route = new_arr.tolist()
-            new_routes.append(new_route)
-        return new_routes
+        # remove the customers together with the station right before them
+        return self.remove_customers(routes, station_offset=-1)
 
     def zone_removal_next(self, routes):
         # reset the removal list
         self.reset_removal()
+        self.zone_customers(routes)
 
-        # find the bound of the all the graph (not only customers, but all nodes)
-        x_lower = min(values[0] for location, values in self.locations.items())
-        x_upper = max(values[0] for location, values in self.locations.items())
-        y_lower = min(values[1] for location, values in self.locations.items())
-        y_upper = max(values[1] for location, values in self.locations.items())
-
-        # split into smaller zones based on the coordinates
-        # first decide the increments
-        x_increment = (ceil(x_upper) - floor(x_lower)) / self.increment
-        y_increment = (ceil(y_upper) - floor(y_lower)) / self.increment
-
-        zones = []
-
-        for i in range(floor(x_lower), ceil(x_upper), ceil(x_increment)):
-            for j in range(floor(y_lower), ceil(y_upper), ceil(y_increment)):
-                zones.append((i, i + x_increment, j, j + y_increment))
-
-        # randomly select a zone and remove the customers inside, if the zone has no customer, continue to next
-        while not self.removal:
-            removal_zone = sample(zones, 1)
-
-            for route in routes:
-                for node in route:
-                    if (
-                            node in self.clients and removal_zone[0][0] <= self.locations[node][0] <= removal_zone[0][
-                        1] and
-                            removal_zone[0][2] <= self.locations[node][1] <= removal_zone[0][3]
-                    ):
-                        self.removal.append(node)
-
-        new_routes = []
-
-        for i in range(len(routes)):
-            arr = np.array(routes[i])
-            remove_index = []
-            for j in range(len(routes[i])):
-                if routes[i][j] in self.removal:
-                    remove_index.append(j)
-                    if routes[i][j + 1] in self.original_stations:
-                        remove_index.append(j + 1)
-            new_arr = np.delete(arr, remove_index)
-            new_route = new_arr.tolist()
-            new_routes.append(new_route)
-        return new_routes
+        # remove the customers together with the station right after them
+        return self.remove_customers(routes, station_offset=1)
 
     def random_route_removal_RRR(self, routes):
         """
@@ -905,11 +690,11 @@ class CustomerRemoval:
         # update the removal list of clients
         for route in routes_removed:
             for node in route:
-                if node in self.clients:
+                if self.is_client[node]:
                     self.removal.append(node)
 
-        # remove the routes to be removed
-        routes_copy = deepcopy(routes)
+        # remove the routes to be removed, the remaining routes are shared with the argument
+        routes_copy = list(routes)
         for route in routes_removed:
             routes_copy.remove(route)
 
@@ -926,13 +711,13 @@ class CustomerRemoval:
         omega = ceil(uniform(self.routes_number_lower * len(routes), self.mr * len(routes)))
 
         # sort the routes according to the increasing order of the number of clients
-        sorted_routes = sorted(routes, key=lambda route: sum(node in self.clients for node in route))
+        sorted_routes = sorted(routes, key=lambda route: sum(self.is_client[node] for node in route))
         routes_removed = sorted_routes[:omega]
 
         # update the removal list of clients
         for route in routes_removed:
             for node in route:
-                if node in self.clients:
+                if self.is_client[node]:
                     self.removal.append(node)
 
         return sorted_routes[omega:]
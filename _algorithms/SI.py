@@ -10,10 +10,14 @@ class StationInsertion:
         """
         self.parameters = parameters
         self.Q = self.parameters["Q"]
-        self.depot_start = self.parameters["depot_start"]
-        self.original_stations = self.parameters["original_stations"]
-        self.clients = self.parameters["clients"]
-        self.arcs = self.parameters["arcs"]
+        self.depot_start = self.parameters["depot_start_id"]
+        self.depot_end = self.parameters["depot_end_id"]
+        self.depot_station = self.parameters["node_index"].get("S0")
+        self.original_stations = self.parameters["original_station_ids"]
+        self.is_original_station = self.parameters["is_original_station"]
+        self.clients = self.parameters["client_ids"]
+        self.is_client = self.parameters["is_client"]
+        self.arcs = self.parameters["distance_matrix"]
         self.h = self.parameters["h"]
         self.checker = MIPCheck(self.parameters)
         self.helper = Helper(self.parameters)
@@ -36,7 +40,7 @@ class StationInsertion:
 
         arrival_energy = self.Q
         for i in range(len(route)):
-            if route[i] in self.depot_start + self.original_stations:
+            if route[i] == self.depot_start or self.is_original_station[route[i]]:
                 arrival_energy = self.Q
             else:
                 arrival_energy -= self.h * self.arcs[route[i - 1], route[i]]
@@ -49,7 +53,7 @@ class StationInsertion:
                     # check if in this arc the predecessor is depot_start or station, if yes return infeasible route
                     # in theory this will never happen because of assumption one station is sufficient to any
                     # will never happen that after one station or depot_station, the customer arrival energy is negative
-                    if route[i - k - 1] in self.depot_start + self.original_stations:
+                    if route[i - k - 1] == self.depot_start or self.is_original_station[route[i - k - 1]]:
                         return route
                     # else we get all possible station insertion at this arc and see whether there is feasible
                     else:
@@ -87,7 +91,7 @@ class StationInsertion:
 
         arrival_energy = self.Q
         for i in range(len(route)):
-            if route[i] in self.depot_start + self.original_stations:
+            if route[i] == self.depot_start or self.is_original_station[route[i]]:
                 arrival_energy = self.Q
             else:
                 arrival_energy -= self.h * self.arcs[route[i - 1], route[i]]
@@ -101,7 +105,7 @@ class StationInsertion:
                 # or there should not be any depot_start or stations in the three nodes
 
                 # if we cannot compare because impossible to insert in either arc, we use GSI above
-                if not (i >= 2 and route[i - 1] in self.clients and route[i - 2] in self.clients):
+                if not (i >= 2 and self.is_client[route[i - 1]] and self.is_client[route[i - 2]]):
                     return self.greedy_station_insertion(route)
                 # else, we find the two minimum at the two arcs
                 else:
@@ -154,12 +158,12 @@ class StationInsertion:
 
         for i in range(len(route)):
             # at this index the arrival is first to update
-            if route[i] == "D0":
+            if route[i] == self.depot_start:
                 arrival_energy = self.Q
             else:
                 arrival_energy = departure_energy - self.h * self.arcs[route[i - 1], route[i]]
 
-            if route[i] in self.depot_start + self.original_stations:
+            if route[i] == self.depot_start or self.is_original_station[route[i]]:
                 departure_energy = self.Q
             else:
                 departure_energy = arrival_energy
@@ -202,7 +206,7 @@ class StationInsertion:
 
         arrival_energy = self.Q
         for i in range(len(route)):
-            if route[i] in self.depot_start + self.original_stations:
+            if route[i] == self.depot_start or self.is_original_station[route[i]]:
                 arrival_energy = self.Q
             else:
                 arrival_energy -= self.h * self.arcs[route[i - 1], route[i]]
@@ -216,7 +220,7 @@ class StationInsertion:
                 for k in range(i):
                     # from the definition above, the index must be larger or equal to 1, no need to check
                     # we traverse the arcs until we reach a station or the depot_start
-                    if route[i - k - 1] in self.depot_start + self.original_stations:
+                    if route[i - k - 1] == self.depot_start or self.is_original_station[route[i - k - 1]]:
                         break
                     # else we get the min feasible distance on this arc
                     else:
@@ -260,12 +264,12 @@ class StationInsertion:
 
         for i in range(len(route)):
             # at this index the arrival is first to update
-            if route[i] == "D0":
+            if route[i] == self.depot_start:
                 arrival_energy = self.Q
             else:
                 arrival_energy = departure_energy - self.h * self.arcs[route[i - 1], route[i]]
 
-            if route[i] in self.depot_start + self.original_stations:
+            if route[i] == self.depot_start or self.is_original_station[route[i]]:
                 departure_energy = self.Q
             else:
                 departure_energy = arrival_energy
@@ -309,12 +313,12 @@ class StationInsertion:
 
         for i in range(len(route)):
             # at this index the arrival is first to update
-            if route[i] == "D0":
+            if route[i] == self.depot_start:
                 arrival_energy = self.Q
             else:
                 arrival_energy = departure_energy - self.h * self.arcs[route[i - 1], route[i]]
 
-            if route[i] in self.depot_start + self.original_stations:
+            if route[i] == self.depot_start or self.is_original_station[route[i]]:
                 departure_energy = self.Q
             else:
                 departure_energy = arrival_energy
@@ -379,22 +383,22 @@ class StationInsertion:
                 route_copy = route[:]
                 for i in range(len(route_copy)):
                     # at this index the arrival is first to update
-                    if route[i] == "D0":
+                    if route[i] == self.depot_start:
                         arrival_energy = self.Q
                     else:
                         arrival_energy = departure_energy - self.h * self.arcs[route[i - 1], route[i]]
 
-                    if route[i] in self.depot_start + self.original_stations:
+                    if route[i] == self.depot_start or self.is_original_station[route[i]]:
                         departure_energy = self.Q
                     else:
                         departure_energy = arrival_energy
 
                     if arrival_energy < 0:
                         # if the insertion location is right after depot_start or before the depot_end
-                        if route_copy[i] == "D0_end" or route_copy[i-1] == "D0":
+                        if route_copy[i] == self.depot_end or route_copy[i-1] == self.depot_start:
                             stations_search = self.original_stations[:]
-                            if "S0" in self.original_stations:
-                                stations_search.remove("S0")
+                            if self.depot_station in self.original_stations:
+                                stations_search.remove(self.depot_station)
                             insertion = min(
                                 stations_search,
                                 key=lambda station: self.arcs[route[i], station] + self.arcs[route[i - 1], station] -
@@ -13,19 +13,21 @@ class StationRemoval():
         self.parameters = parameters
         self.checker = MIPCheck(self.parameters)
         self.helper = Helper(self.parameters)
-        self.clients = self.parameters["clients"]
-        self.stations = self.parameters["stations"]
+        self.clients = self.parameters["client_ids"]
+        self.is_client = self.parameters["is_client"]
+        self.stations = self.parameters["station_ids"]
         self.all_nodes = self.parameters["all_nodes"]
-        self.depot_start = self.parameters["depot_start"]
-        self.depot_end = self.parameters["depot_end"]
-        self.demand = self.parameters["demand"]
-        self.ready_time = self.parameters["ready_time"]
-        self.due_date = self.parameters["due_date"]
-        self.service_time = self.parameters["service_time"]
-        self.arcs = self.parameters["arcs"]
-        self.times = self.parameters["times"]
+        self.depot_start = self.parameters["depot_start_id"]
+        self.depot_end = self.parameters["depot_end_id"]
+        self.demand = self.parameters["demand_array"].tolist()
+        self.ready_time = self.parameters["ready_time_array"].tolist()
+        self.due_date = self.parameters["due_date_array"].tolist()
+        self.service_time = self.parameters["service_time_array"].tolist()
+        self.arcs = self.parameters["distance_matrix"]
+        self.times = self.parameters["time_matrix"]
         self.final_data = self.parameters["final_data"]
-        self.original_stations = self.parameters["original_stations"]
+        self.original_stations = self.parameters["original_station_ids"]
+        self.is_original_station = self.parameters["is_original_station"]
         self.Q = self.parameters["Q"]
         self.C = self.parameters["C"]
         self.g = self.parameters["g"]
@@ -35,6 +37,22 @@ class StationRemoval():
         self.lower = 0.1
         self.upper = 0.4
 
+    def remove_stations(self, routes, removal_stations):
+        """
+        This is the function to remove the stations at the given positions, copy on write
+        :param routes: solution
+        :param removal_stations: list of (route index, node index) of the stations to remove
+        :return: new list of routes, the routes without removed stations are shared with the argument
+        """
+        removal_index = {}
+        for i, j in removal_stations:
+            removal_index.setdefault(i, set()).add(j)
+
+        new_routes = list(routes)
+        for i, remove_index in removal_index.items():
+            new_routes[i] = [node for j, node in enumerate(routes[i]) if j not in remove_index]
+        return new_routes
+
     def random_removal(self, routes):
         """
         This is the function to randomly remove some stations in routes
@@ -46,7 +64,7 @@ class StationRemoval():
         counter_stations = 0
         for route in routes:
             for node in route:
-                if node in self.original_stations:
+                if self.is_original_station[node]:
                     counter_stations += 1
 
         # get the upper and lower
@@ -58,24 +76,14 @@ class StationRemoval():
         index_stations = []
         for i in range(len(routes)):
             for j in range(len(routes[i])):
-                if routes[i][j] in self.original_stations:
+                if self.is_original_station[routes[i][j]]:
                     index_stations.append((i, j))
 
         # sample to get random removed stations indices
         removal_stations = sample(index_stations, sigma)
 
         # then we remove the stations
-        new_routes = []
-        for i in range(len(routes)):
-            new_route = []
-            for j in range(len(routes[i])):
-                if (i, j) in removal_stations:
-                    continue
-                else:
-                    new_route.append(routes[i][j])
-            new_routes.append(new_route)
-
-        return new_routes
+        return self.remove_stations(routes, removal_stations)
 
     def worst_distance_removal(self, routes):
         """
@@ -86,7 +94,7 @@ class StationRemoval():
         counter_stations = 0
         for route in routes:
             for node in route:
-                if node in self.original_stations:
+                if self.is_original_station[node]:
                     counter_stations += 1
 
         # get the upper and lower
@@ -98,7 +106,7 @@ class StationRemoval():
         distance_stations = {}
         for i in range(len(routes)):
             for j in range(len(routes[i])):
-                if routes[i][j] in self.original_stations:
+                if self.is_original_station[routes[i][j]]:
                     distance_stations[(i,j)] = (self.arcs[routes[i][j-1], routes[i][j]] +
                                                 self.arcs[routes[i][j+1], routes[i][j]])
 
@@ -109,17 +117,7 @@ class StationRemoval():
         removal_stations = sorted_stations[:sigma+1]
 
         # then we remove the stations
-        new_routes = []
-        for i in range(len(routes)):
-            new_route = []
-            for j in range(len(routes[i])):
-                if (i, j) in removal_stations:
-                    continue
-                else:
-                    new_route.append(routes[i][j])
-            new_routes.append(new_route)
-
-        return new_routes
+        return self.remove_stations(routes, removal_stations)
 
     def worst_charge_removal(self, routes):
         """
@@ -130,7 +128,7 @@ class StationRemoval():
         counter_stations = 0
         for route in routes:
             for node in route:
-                if node in self.original_stations:
+                if self.is_original_station[node]:
                     counter_stations += 1
 
         # get the upper and lower
@@ -143,7 +141,7 @@ class StationRemoval():
         for i in range(len(routes)):
             arrival_energy = self.checker.energy_extractor(routes[i])
             for j in range(len(routes[i])):
-                if routes[i][j] in self.original_stations:
+                if self.is_original_station[routes[i][j]]:
                     energy_cost[(i, j)] = arrival_energy[j]
 
         # sorted the stations from high arrival energy to low, since high energy arrival means high cost
@@ -153,17 +151,7 @@ class StationRemoval():
         removal_stations = sorted_stations[:sigma + 1]
 
         # then we remove the stations
-        new_routes = []
-        for i in range(len(routes)):
-            new_route = []
-            for j in range(len(routes[i])):
-                if (i, j) in removal_stations:
-                    continue
-                else:
-                    new_route.append(routes[i][j])
-            new_routes.append(new_route)
-
-        return new_routes
+        return self.remove_stations(routes, removal_stations)
 
     def full_removal(self, routes):
         """
@@ -174,7 +162,7 @@ class StationRemoval():
         counter_stations = 0
         for route in routes:
             for node in route:
-                if node in self.original_stations:
+                if self.is_original_station[node]:
                     counter_stations += 1
 
         # get the upper and lower
@@ -187,31 +175,15 @@ class StationRemoval():
         for i in range(len(routes)):
             departure_energy = self.checker.energy_extractor_departure(routes[i])
             for j in range(len(routes[i])):
-                if routes[i][j] in self.original_stations:
+                if self.is_original_station[routes[i][j]]:
                     if departure_energy[j] == self.Q:
                         removal_stations.append((i, j))
 
         # then we remove the stations
         # first we test if the number of the full charge stations is greater than sigma
         # if smaller or equal, we remove them all, otherwise we randomly remove sigma
-        new_routes = []
         if len(removal_stations) <= sigma:
-            for i in range(len(routes)):
-                new_route = []
-                for j in range(len(routes[i])):
-                    if (i, j) in removal_stations:
-                        continue
-                    else:
-                        new_route.append(routes[i][j])
-                new_routes.append(new_route)
+            return self.remove_stations(routes, removal_stations)
         else:
             new_removal_stations = sample(removal_stations, sigma)
-            for i in range(len(routes)):
-                new_route = []
-                for j in range(len(routes[i])):
-                    if (i, j) in new_removal_stations:
-                        continue
-                    else:
-                        new_route.append(routes[i][j])
-                new_routes.append(new_route)
-        return new_routes
+            return self.remove_stations(routes, new_removal_stations)
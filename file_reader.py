@@ -1,64 +1,505 @@
 import string
+from collections.abc import Mapping
 from typing import Any, Dict
-import pandas as pd
 import numpy as np
-import math
 import statistics
+import hashlib
+import zipfile
+import os
 
 """
 This file contains the functions that extract the parameters and check them for instances
 Enhanced with wireless charging capabilities (clean version)
 """
 
+# node type codes of the integer node table
+DEPOT = 0
+STATION = 1
+CLIENT = 2
 
-def get_parameters(file: string, num: int = 0, wireless_coverage: str = "none") -> Dict[string, Any]:
+# version of the arrays saved in the instance cache, a new version ignores the files of the previous ones
+CACHE_VERSION = 4
+
+# general parameters of the last lines of an instance file, by their first letter, "r" is the fuel consumption rate h
+CONSTANTS = {"Q": "Q", "C": "C", "g": "g", "r": "h", "v": "v"}
+
+# fraction of every arc covered by wireless charging for the named coverage levels
+COVERAGE_LEVELS = {"none": 0.0, "light": 0.2, "moderate": 0.4, "high": 0.6}
+
+
+class ArcMatrix(Mapping):
     """
-    Extract parameters from the instance files with wireless charging support
+    Dict-style view over a square matrix, keeping the arcs[i, j] lookups with node names
+    """
+
+    def __init__(self, matrix, node_index):
+        """
+        :param matrix: square numpy array, rows and columns follow the node index
+        :param node_index: dict mapping a node name to its row in the matrix
+        """
+        self.matrix = matrix
+        self.node_index = node_index
+
+    def __getitem__(self, key):
+        i, j = key
+        return self.matrix.item(self.node_index[i], self.node_index[j])
+
+    def __setitem__(self, key, value):
+        i, j = key
+        self.matrix[self.node_index[i], self.node_index[j]] = value
+
+    def __iter__(self):
+        for i in self.node_index:
+            for j in self.node_index:
+                yield i, j
+
+    def __len__(self):
+        return len(self.node_index) ** 2
+
+    def __contains__(self, key):
+        try:
+            i, j = key
+        except (TypeError, ValueError):
+            return False
+        return i in self.node_index and j in self.node_index
+
+    def copy(self):
+        """
+        Copy the underlying matrix, the node index is shared since it never changes
+        :return: new ArcMatrix
+        """
+        return ArcMatrix(self.matrix.copy(), self.node_index)
+
+
+def instance_cache_file(cache_dir: string, file: string) -> string:
+    """
+    Path of the cached arrays of an instance, keyed by the content of the file
+    :param cache_dir: directory of the cache
     :param file: txt instance file
-    :param num: number of dummy for each charging station
-    :param wireless_coverage: wireless coverage level ("none", "light", "moderate", "high")
-    :return: dict storing parameters
+    :return: path of the .npz file
+    """
+    with open(file, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:24]
+    name = "%s_%s_v%d.npz" % (os.path.splitext(os.path.basename(file))[0], digest, CACHE_VERSION)
+    return os.path.join(cache_dir, name)
+
+
+def save_instance(cache_file: string, instance: Dict[string, Any]):
+    """
+    Void function, save the arrays of a parsed instance in an uncompressed .npz file
+    The file is written next to the target first and then renamed, so a concurrent reader never sees a partial file
+    :param cache_file: path of the .npz file
+    :param instance: dict of the arrays returned by parse_instance
+    """
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+    temporary = "%s.%d.tmp" % (cache_file, os.getpid())
+    with open(temporary, "wb") as f:
+        np.savez(f, **instance)
+    os.replace(temporary, cache_file)
+
+
+def load_instance(cache_file: string):
+    """
+    Load the arrays of an instance saved by save_instance
+    :param cache_file: path of the .npz file
+    :return: dict of the arrays, None if the file does not exist or cannot be read
+    """
+    try:
+        with np.load(cache_file, allow_pickle=False) as data:
+            return {key: data[key] for key in data.files}
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def parse_instance(file: string) -> Dict[string, Any]:
+    """
+    Read an instance file and compute its distance and time matrices, which do not depend on the wireless coverage
+    :param file: txt instance file
+    :return: dict of arrays, the node names, types and table (x, y, demand, ready time, due date, service time),
+    the constants Q, C, g, h and v, and the distance and time matrices
+    """
+    # read the node rows and the general parameters in one pass over the file
+    names = []
+    types = []
+    table = []
+    constants = {}
+    with open(file, 'r') as f:
+        for number, line in enumerate(f, 1):
+            fields = line.split()
+            if not fields or fields[0] == "StringID":
+                continue
+            if "/" in line:
+                # general parameter, e.g. "Q Vehicle fuel tank capacity /79.69/"
+                if fields[0] in CONSTANTS:
+                    constants[CONSTANTS[fields[0]]] = float(line.split('/')[1])
+                continue
+            if len(fields) != 8:
+                raise ValueError("line %d of %s is not a node row" % (number, file))
+            names.append(fields[0])
+            types.append(fields[1])
+            table.append([float(field) for field in fields[2:]])
+    missing = [name for name in CONSTANTS.values() if name not in constants]
+    if missing:
+        raise ValueError("missing general parameters in %s: %s" % (file, ", ".join(missing)))
+    Q, C, g, h, v = (constants[name] for name in ("Q", "C", "g", "h", "v"))
+    table = np.array(table, dtype=float)
+
+    # the copy of the depot ends the routes
+    names.append("D0_end")
+    types.append(types[0])
+    table = np.vstack((table, table[0:1]))
+
+    coordinates = table[:, 0:2]
+
+    # pairwise euclidean distances and travel times by broadcasting the coordinates
+    delta_x = np.subtract.outer(coordinates[:, 0], coordinates[:, 0])
+    delta_y = np.subtract.outer(coordinates[:, 1], coordinates[:, 1])
+    distance_matrix = np.sqrt(delta_x ** 2 + delta_y ** 2)
+    time_matrix = distance_matrix / v
+
+    return {"names": np.array(names),
+            "types": np.array(types),
+            "table": table,
+            "constants": np.array([Q, C, g, h, v]),
+            "distance_matrix": distance_matrix,
+            "time_matrix": time_matrix}
+
+
+def coverage_fraction_of(wireless_coverage) -> float:
+    """
+    Fraction of every arc covered by wireless charging
+    :param wireless_coverage: coverage level ("none", "light", "moderate", "high") or a fraction between 0 and 1
+    :return: the fraction, 0 for an unknown level
+    """
+    if isinstance(wireless_coverage, str):
+        return COVERAGE_LEVELS.get(wireless_coverage, 0.0)
+    fraction = float(wireless_coverage)
+    if not 0.0 <= fraction <= 1.0:
+        raise ValueError("the wireless coverage fraction must be between 0 and 1: " + str(wireless_coverage))
+    return fraction
+
+
+def load_segments(file: string) -> np.ndarray:
+    """
+    Read the electrified road segments of a wireless charging deployment
+    Each line holds the x and y of the points of a polyline, separated by spaces or commas, at least two points.
+    Empty lines, lines starting with a text header and what follows a # are ignored
+    :param file: txt or csv segment file
+    :return: array of shape (number of segments, 4), x1, y1, x2, y2 of every straight segment of the polylines
+    """
+    segments = []
+    with open(file, "r") as f:
+        for number, line in enumerate(f, 1):
+            fields = line.split("#")[0].replace(",", " ").split()
+            if not fields:
+                continue
+            try:
+                values = [float(field) for field in fields]
+            except ValueError:
+                # header line
+                continue
+            if len(values) < 4 or len(values) % 2:
+                raise ValueError("line %d of %s is not a polyline of x y points" % (number, file))
+            points = np.array(values).reshape(-1, 2)
+            segments.append(np.hstack((points[:-1], points[1:])))
+    if not segments:
+        return np.zeros((0, 4))
+    return np.vstack(segments)
+
+
+def lane_intervals(starts: np.ndarray, directions: np.ndarray, segments: np.ndarray, half: float):
+    """
+    Parameter interval of the part of every arc inside the lane of its segment, the lane is the set of the points
+    within half of the segment. The lane is convex, so the part is a single interval, the hull of the parts in the
+    rectangle along the segment and in the disks at its ends
+    :param starts: array of shape (number of pairs, 2), start of the arcs
+    :param directions: array of shape (number of pairs, 2), end minus start of the arcs, not zero
+    :param segments: array of shape (number of pairs, 4), x1, y1, x2, y2 of the segments
+    :param half: half of the lane width
+    :return: arrays of the interval bounds, between 0 and 1, empty when the low bound is not below the high one
+    """
+    low = np.full(len(starts), np.inf)
+    high = np.full(len(starts), -np.inf)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # the disks at the two ends of the segment
+        for center in (segments[:, :2], segments[:, 2:]):
+            offset = starts - center
+            a = (directions * directions).sum(axis=1)
+            b = (offset * directions).sum(axis=1)
+            discriminant = b * b - a * ((offset * offset).sum(axis=1) - half * half)
+            root = np.sqrt(np.maximum(discriminant, 0.0))
+            met = discriminant >= 0
+            low = np.where(met, np.minimum(low, (-b - root) / a), low)
+            high = np.where(met, np.maximum(high, (-b + root) / a), high)
+
+        # the rectangle, clipped along and across the segment in its own frame
+        axis = segments[:, 2:] - segments[:, :2]
+        length = np.sqrt((axis * axis).sum(axis=1))
+        along = axis / np.where(length > 0, length, 1.0)[:, None]
+        across = np.stack((-along[:, 1], along[:, 0]), axis=1)
+        offset = starts - segments[:, :2]
+        rectangle_low = np.zeros(len(starts))
+        rectangle_high = np.ones(len(starts))
+        inside = length > 0
+        for frame, bound_low, bound_high in ((along, 0.0, length), (across, -half, half)):
+            position = (offset * frame).sum(axis=1)
+            speed = (directions * frame).sum(axis=1)
+            moving = speed != 0
+            first = (bound_low - position) / speed
+            second = (bound_high - position) / speed
+            rectangle_low = np.where(moving, np.maximum(rectangle_low, np.minimum(first, second)), rectangle_low)
+            rectangle_high = np.where(moving, np.minimum(rectangle_high, np.maximum(first, second)), rectangle_high)
+            # parallel to the bounds, the arc is inside for every parameter or never
+            inside &= moving | ((position >= bound_low) & (position <= bound_high))
+        inside &= rectangle_low <= rectangle_high
+        low = np.where(inside, np.minimum(low, rectangle_low), low)
+        high = np.where(inside, np.maximum(high, rectangle_high), high)
+
+    return np.maximum(low, 0.0), np.minimum(high, 1.0)
+
+
+def lane_candidates(coordinates: np.ndarray, origin: int, segments: np.ndarray, half: float):
     """
+    The arcs from a node towards the following nodes whose direction meets the lane of a segment
+    Seen from the node, a lane not containing it spans the angles between its tangents, the hull of the angles of
+    the disks at its ends, so the nodes in these angles are found by a binary search in the nodes sorted by angle
+    :param coordinates: array of shape (number of nodes, 2)
+    :param origin: index of the node, the arcs go towards the nodes of higher index
+    :param segments: array of shape (number of segments, 4)
+    :param half: half of the lane width
+    :return: arrays of the end nodes and of the segments of the candidate pairs
+    """
+    ends = np.arange(origin + 1, len(coordinates))
+    offsets = coordinates[ends] - coordinates[origin]
+    moved = (offsets != 0).any(axis=1)
+    ends, offsets = ends[moved], offsets[moved]
+    if not len(ends):
+        return ends, ends
+    angles = np.arctan2(offsets[:, 1], offsets[:, 0])
+    order = np.argsort(angles)
+    ends, angles = ends[order], angles[order]
+    circle = np.concatenate((angles, angles + 2 * np.pi))
+
+    first = segments[:, :2] - coordinates[origin]
+    second = segments[:, 2:] - coordinates[origin]
+    first_distance = np.sqrt((first * first).sum(axis=1))
+    second_distance = np.sqrt((second * second).sum(axis=1))
+    first_angle = np.arctan2(first[:, 1], first[:, 0])
+    turn = np.arctan2(second[:, 1], second[:, 0]) - first_angle
+    second_angle = first_angle + (turn + np.pi) % (2 * np.pi) - np.pi
+    with np.errstate(divide="ignore"):
+        first_spread = np.arcsin(np.minimum(half / first_distance, 1.0))
+        second_spread = np.arcsin(np.minimum(half / second_distance, 1.0))
+    # a small margin keeps the rounding of the angles on the safe side, the pairs are clipped exactly afterwards
+    low = np.minimum(first_angle - first_spread, second_angle - second_spread) - 1e-9
+    high = np.maximum(first_angle + first_spread, second_angle + second_spread) + 1e-9
+
+    # the node inside a lane sees it in every direction
+    axis = segments[:, 2:] - segments[:, :2]
+    length = (axis * axis).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip(np.where(length > 0, -(first * axis).sum(axis=1) / length, 0.0), 0.0, 1.0)
+    gap = first + t[:, None] * axis
+    inside = (gap * gap).sum(axis=1) <= half * half
+
+    shift = np.floor((low + np.pi) / (2 * np.pi)) * 2 * np.pi
+    starts = np.searchsorted(circle, low - shift, side="left")
+    counts = np.minimum(np.searchsorted(circle, high - shift, side="right") - starts, len(ends))
+    starts[inside] = 0
+    counts[inside] = len(ends)
+
+    total = counts.sum()
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    positions = (np.repeat(starts, counts) + offsets) % len(ends)
+    return ends[positions], np.repeat(np.arange(len(segments)), counts)
+
+
+def arc_coverage(coordinates: np.ndarray, segments: np.ndarray, width: float = 1.0) -> np.ndarray:
+    """
+    Covered fraction of the straight path of every arc, by charging lanes of a given width along the segments
+    The pairs of an arc and a lane its direction meets are found by lane_candidates, then every pair is clipped
+    exactly and the covered intervals of an arc are merged so that the overlapping lanes are counted once
+    :param coordinates: array of shape (number of nodes, 2)
+    :param segments: array of shape (number of segments, 4) returned by load_segments
+    :param width: width of a charging lane, a point of an arc is covered within width / 2 of a segment
+    :return: square array of the covered fractions, 0 on the diagonal and for the arcs of zero length
+    """
+    coordinates = np.asarray(coordinates, dtype=float)
+    segments = np.asarray(segments, dtype=float).reshape(-1, 4)
+    nodes = len(coordinates)
+    coverage = np.zeros((nodes, nodes))
+    half = width / 2
+    if half <= 0:
+        raise ValueError("the lane width must be positive")
+    if not len(segments):
+        return coverage
+
+    # the arcs are symmetric, only the arcs towards the following nodes are clipped and the lower triangle is mirrored
+    # the pairs are clipped by blocks of origins to bound the memory, an arc has all its pairs in the same block
+    pending = []
+    size = 0
+    for origin in range(nodes):
+        ends, lanes = lane_candidates(coordinates, origin, segments, half)
+        pending.append((np.full(len(ends), origin), ends, lanes))
+        size += len(ends)
+        if size < 2 ** 21 and origin < nodes - 1:
+            continue
+        origins, ends, lanes = (np.concatenate(column) for column in zip(*pending))
+        pending = []
+        size = 0
+        if not len(origins):
+            continue
+        starts = coordinates[origins]
+        low, high = lane_intervals(starts, coordinates[ends] - starts, segments[lanes], half)
+        met = low < high
+        origins, ends, low, high = origins[met], ends[met], low[met], high[met]
+
+        # merge the intervals of each arc: shifted by 2 per arc, the running maximum of the high bounds in the order
+        # of the low bounds never carries over from one arc to the next
+        arcs, arc = np.unique(origins * nodes + ends, return_inverse=True)
+        low = low + 2.0 * arc
+        high = high + 2.0 * arc
+        order = np.argsort(low, kind="stable")
+        arc, low, high = arc[order], low[order], high[order]
+        reached = np.maximum.accumulate(high)
+        previous = np.concatenate(([-np.inf], reached[:-1]))
+        covered = np.bincount(arc, weights=np.maximum(high - np.maximum(low, previous), 0.0), minlength=len(arcs))
+        coverage.flat[arcs] = np.minimum(covered, 1.0)
+
+    return coverage + coverage.T
+
+
+def segment_coverage(parameters: Dict[string, Any], file: string, width: float = 1.0) -> np.ndarray:
+    """
+    Covered fraction of every arc of an instance by the electrified segments of a file, see arc_coverage
+    The result is a wireless coverage for get_parameters, coverage_view or coverage_sweep
+    :param parameters: parameter dict of the instance
+    :param file: segment file read by load_segments
+    :param width: width of a charging lane
+    :return: square array of the covered fractions, rows and columns follow the node index
+    """
+    return arc_coverage(parameters["coordinates"], load_segments(file), width)
+
+
+def coverage_parameters(parameters: Dict[string, Any], wireless_coverage) -> Dict[string, Any]:
+    """
+    Compute the parameters depending on the wireless coverage, from the distance matrix of the instance
+    :param parameters: parameter dict of the instance, its distance matrix, node index, h and charging rate are used
+    :param wireless_coverage: coverage level ("none", "light", "moderate", "high"), a fraction between 0 and 1 of
+    every arc, or a square array of the fraction of each arc
+    :return: dict of the coverage, wireless charge and net energy entries of the parameters
+    """
+    distance_matrix = parameters["distance_matrix"]
+    node_index = parameters["node_index"]
+
+    if isinstance(wireless_coverage, np.ndarray):
+        # heterogeneous coverage, the level is reported as "arcs" with the mean fraction of the arcs
+        if wireless_coverage.shape != distance_matrix.shape:
+            raise ValueError("the coverage array must have the shape of the distance matrix")
+        if wireless_coverage.min() < 0.0 or wireless_coverage.max() > 1.0:
+            raise ValueError("the wireless coverage fractions must be between 0 and 1")
+        coverage_matrix = wireless_coverage.astype(float)
+        np.fill_diagonal(coverage_matrix, 0.0)
+        wireless_coverage = "arcs"
+        arcs = max(coverage_matrix.size - len(coverage_matrix), 1)
+        coverage_fraction = float(coverage_matrix.sum()) / arcs
+    else:
+        coverage_fraction = coverage_fraction_of(wireless_coverage)
+
+        # Apply coverage to all arcs, no coverage on the loops
+        coverage_matrix = np.full(distance_matrix.shape, coverage_fraction)
+        np.fill_diagonal(coverage_matrix, 0.0)
+
+    # Calculate wireless charging for each arc
+    wireless_charge_matrix = parameters["w_charge_rate"] * (distance_matrix * coverage_matrix)
+
+    # Calculate net energy consumption (fuel consumption - wireless charging)
+    energy_matrix = parameters["h"] * distance_matrix - wireless_charge_matrix
+
+    return {"wireless_coverage": ArcMatrix(coverage_matrix, node_index),
+            "wireless_charge": ArcMatrix(wireless_charge_matrix, node_index),
+            "net_energy_consumption": ArcMatrix(energy_matrix, node_index),
+            "coverage_level": wireless_coverage,
+            "coverage_fraction": coverage_fraction,
+            "energy_matrix": energy_matrix}
 
-    # get the data frame cleaning the parameter description sentences in the last 5 rows
-    df = pd.read_csv(file, sep='\s+')
-    df_filtered = df.iloc[:-5]
 
-    # convert the data frame to numpy array
-    original_data = df_filtered.to_numpy()
+def coverage_view(parameters: Dict[string, Any], wireless_coverage) -> Dict[string, Any]:
+    """
+    Parameters of the same instance with another wireless coverage
+    The node data and the distance and time matrices are shared with the given parameters, only the matrices depending
+    on the coverage are computed
+    :param parameters: parameter dict of the instance
+    :param wireless_coverage: coverage level ("none", "light", "moderate", "high"), a fraction between 0 and 1 of
+    every arc, or a square array of the fraction of each arc
+    :return: new parameter dict
+    """
+    view = dict(parameters)
+    view.update(coverage_parameters(parameters, wireless_coverage))
+    return view
 
-    # get the copy of the depot row and change the name
-    depot_copy = original_data[0].copy()
-    depot_copy[0] = "D0_end"
 
-    # read lines from text and get the general parameters from last 5 rows
-    with open(file, 'r') as file:
-        lines = file.readlines()
+def coverage_sweep(file: string, coverages, num: int = 0, cache_dir: string = None):
+    """
+    Load an instance once and derive its parameters for several wireless coverages
+    :param file: txt instance file
+    :param coverages: iterable of coverage levels, fractions or arrays of the fraction of each arc
+    :param num: number of dummy for each charging station
+    :param cache_dir: directory of the parsed instance cache, None for no cache
+    :return: generator of (coverage, parameter dict), the dicts share the node data and the distance and time matrices
+    """
+    parameters = get_parameters(file, num, cache_dir=cache_dir)
+    for wireless_coverage in coverages:
+        yield wireless_coverage, coverage_view(parameters, wireless_coverage)
+
+
+def get_parameters(file: string, num: int = 0, wireless_coverage: str = "none",
+                   cache_dir: string = None) -> Dict[string, Any]:
+    """
+    Extract parameters from the instance files with wireless charging support
+    :param file: txt instance file
+    :param num: number of dummy for each charging station. The dummies are named nodes aliasing the row of their
+    station in node_index, they share its data and matrix entries and do not add any row to the matrices or to the
+    per node arrays, which only cover the nodes of the file and the copy of the depot
+    :param wireless_coverage: wireless coverage level ("none", "light", "moderate", "high"), a fraction between 0
+    and 1 of every arc, or a square array of the fraction of each arc following the matrix rows
+    :param cache_dir: directory where the parsed arrays of the instances are cached, the file is only parsed the first
+    time and the arrays are loaded from the cache afterwards, None for no cache
+    :return: dict storing parameters
+    """
+    # Wireless charging parameters
+    w_charge_rate = 0.9  # Fixed wireless charging rate per unit distance
 
-        for line in lines:
-            if line.startswith('Q Vehicle fuel tank capacity'):
-                Q = float(line.split('/')[1])
-            elif line.startswith('C Vehicle load capacity'):
-                C = float(line.split('/')[1])
-            elif line.startswith('g inverse refueling rate'):
-                g = float(line.split('/')[1])
-            elif line.startswith('r fuel consumption rate'):
-                h = float(line.split('/')[1])
-            elif line.startswith('v average Velocity'):
-                v = float(line.split('/')[1])
+    # parse the file, or load the arrays of the same file content from the cache
+    instance = None
+    if cache_dir is not None:
+        cache_file = instance_cache_file(cache_dir, file)
+        instance = load_instance(cache_file)
+    if instance is None:
+        instance = parse_instance(file)
+        if cache_dir is not None:
+            save_instance(cache_file, instance)
 
-    # get the number of charging stations and the index of the final station
-    final_station_index = np.sum(df_filtered["Type"] == 'f')
-    stations_copy = original_data[1:final_station_index + 1].copy()
-    original_stations = [str(row[0]) for count, row in enumerate(stations_copy)]
+    Q, C, g, h, v = instance["constants"].tolist()
+    distance_matrix = instance["distance_matrix"]
+    time_matrix = instance["time_matrix"]
 
-    # replicate all the stations and change the names
-    replicate_stations = np.tile(stations_copy, (num, 1))
-    for count, value in enumerate(replicate_stations):
-        value[0] = "S_dummy" + str(count)
+    # the stations follow the depot, each dummy aliases the row of the station it replicates
+    names = instance["names"].tolist()
+    types = instance["types"].tolist()
+    table = instance["table"]
+    original_stations = names[1:types.count("f") + 1]
+    if any(kind != "f" for kind in types[1:len(original_stations) + 1]):
+        raise ValueError("the stations of %s must follow the depot" % file)
+    dummy_rows = [names.index(station) for station in original_stations] * num
+    alias = {"S_dummy" + str(count): row for count, row in enumerate(dummy_rows)}
 
-    # concatenate all the arrays
-    final_data = np.vstack((original_data, depot_copy, replicate_stations))
+    # the node table, the nodes of the file and the copy of the depot followed by the dummies
+    rows = names + list(alias)
+    final_data = np.empty((len(rows), 8), dtype=object)
+    final_data[:, 0] = rows
+    final_data[:, 1] = types + ["f"] * len(alias)
+    final_data[:, 2:8] = np.vstack((table, table[dummy_rows]))
 
     # extract the client, charging stations, depots and all nodes
     clients = [str(row[0]) for count, row in enumerate(final_data) if str(row[1]) == "c"]
@@ -73,8 +514,6 @@ def get_parameters(file: string, num: int = 0, wireless_coverage: str = "none")
     ready_time = {}
     due_date = {}
     service_time = {}
-    arcs = {}
-    times = {}
 
     for index, row in enumerate(final_data):
         locations[row[0]] = (float(row[2]), float(row[3]))
@@ -83,52 +522,22 @@ def get_parameters(file: string, num: int = 0, wireless_coverage: str = "none")
         due_date[row[0]] = float(row[6])
         service_time[row[0]] = float(row[7])
 
-    for key1, value1 in locations.items():
-        for key2, value2 in locations.items():
-            arcs[(key1, key2)] = math.sqrt((value1[0] - value2[0])**2 + ((value1[1] - value2[1]))**2)
-            times[(key1, key2)] = math.sqrt((value1[0] - value2[0])**2 + ((value1[1] - value2[1]))**2)/v
+    # the row of a node in every matrix and per node array is its position in all_nodes, or its station for a dummy
+    node_index = {node: index for index, node in enumerate(names)}
+    node_index.update(alias)
+    coordinates = table[:, 0:2]
 
-    # === WIRELESS CHARGING INTEGRATION ===
-    
-    # Wireless charging parameters
-    w_charge_rate = 0.9  # Fixed wireless charging rate per unit distance
-    
-    # Set wireless coverage based on pattern
-    wireless_coverage_dict = {}
-    coverage_fraction = 0.0
-    
-    if wireless_coverage == "none":
-        coverage_fraction = 0.0
-    elif wireless_coverage == "light":
-        coverage_fraction = 0.2  # 20% coverage
-    elif wireless_coverage == "moderate":
-        coverage_fraction = 0.4  # 40% coverage
-    elif wireless_coverage == "high":
-        coverage_fraction = 0.6  # 60% coverage
-    else:
-        coverage_fraction = 0.0
-    
-    # Apply coverage to all arcs
-    for key1 in all_nodes:
-        for key2 in all_nodes:
-            if key1 != key2:
-                wireless_coverage_dict[(key1, key2)] = coverage_fraction
-    
-    # Calculate wireless charging for each arc
-    wireless_charge = {}
-    for (i, j), distance in arcs.items():
-        coverage = wireless_coverage_dict.get((i, j), 0.0)
-        wireless_distance = distance * coverage
-        wireless_charge[(i, j)] = w_charge_rate * wireless_distance
-    
-    # Calculate net energy consumption (fuel consumption - wireless charging)
-    net_energy_consumption = {}
-    
-    for (i, j), distance in arcs.items():
-        fuel_consumption = h * distance
-        wireless_gained = wireless_charge[(i, j)]
-        net_consumption = fuel_consumption - wireless_gained
-        net_energy_consumption[(i, j)] = net_consumption
+    # dict-style views keyed by node names on top of the matrices
+    arcs = ArcMatrix(distance_matrix, node_index)
+    times = ArcMatrix(time_matrix, node_index)
+
+    # node types, per node arrays and integer ids used by the ALNS operators on integer routes
+    node_type = np.full(len(names), DEPOT, dtype=np.int8)
+    node_type[instance["types"] == "f"] = STATION
+    node_type[instance["types"] == "c"] = CLIENT
+    is_original_station = [False] * len(names)
+    for station in original_stations:
+        is_original_station[node_index[station]] = True
 
     travel_time_series = []
     for client in clients:
@@ -147,10 +556,27 @@ def get_parameters(file: string, num: int = 0, wireless_coverage: str = "none")
                   "time_series": travel_time_series, "normal_times": normal_times,
                   # Wireless charging parameters
                   "w_charge_rate": w_charge_rate,
-                  "wireless_coverage": wireless_coverage_dict,
-                  "wireless_charge": wireless_charge,
-                  "net_energy_consumption": net_energy_consumption,
-                  "coverage_level": wireless_coverage,
-                  "coverage_fraction": coverage_fraction}
+                  # Matrix representation indexed by node_index
+                  "node_index": node_index,
+                  "dummy_stations": {dummy: names[row] for dummy, row in alias.items()},
+                  "coordinates": coordinates,
+                  "distance_matrix": distance_matrix,
+                  "time_matrix": time_matrix,
+                  "node_type": node_type,
+                  "client_ids": [node_index[client] for client in clients],
+                  "station_ids": [index for index, kind in enumerate(types) if kind == "f"],
+                  "original_station_ids": [node_index[station] for station in original_stations],
+                  "depot_start_id": node_index["D0"],
+                  "depot_end_id": node_index["D0_end"],
+                  "is_client": (node_type == CLIENT).tolist(),
+                  "is_station": (node_type == STATION).tolist(),
+                  "is_original_station": is_original_station,
+                  "demand_array": table[:, 2].copy(),
+                  "ready_time_array": table[:, 3].copy(),
+                  "due_date_array": table[:, 4].copy(),
+                  "service_time_array": table[:, 5].copy()}
+
+    # === WIRELESS CHARGING INTEGRATION ===
+    parameters.update(coverage_parameters(parameters, wireless_coverage))
 
     return parameters
\ No newline at end of file
@@ -1,4 +1,5 @@
 import string
+import numpy as np
 from EVRPTW_PR_ALNS.mip_check import MIPCheck
 
 
@@ -10,17 +11,18 @@ class Helper:
         """
         self.parameters = parameters
         self.checker = MIPCheck(self.parameters)
-        self.clients = self.parameters["clients"]
-        self.stations = self.parameters["stations"]
+        self.clients = self.parameters["client_ids"]
+        self.is_client = self.parameters["is_client"]
+        self.stations = self.parameters["station_ids"]
         self.all_nodes = self.parameters["all_nodes"]
-        self.depot_start = self.parameters["depot_start"]
-        self.depot_end = self.parameters["depot_end"]
-        self.demand = self.parameters["demand"]
-        self.ready_time = self.parameters["ready_time"]
-        self.due_date = self.parameters["due_date"]
-        self.service_time = self.parameters["service_time"]
-        self.arcs = self.parameters["arcs"]
-        self.times = self.parameters["times"]
+        self.depot_start = self.parameters["depot_start_id"]
+        self.depot_end = self.parameters["depot_end_id"]
+        self.demand = self.parameters["demand_array"].tolist()
+        self.ready_time = self.parameters["ready_time_array"].tolist()
+        self.due_date = self.parameters["due_date_array"].tolist()
+        self.service_time = self.parameters["service_time_array"].tolist()
+        self.arcs = self.parameters["distance_matrix"]
+        self.times = self.parameters["time_matrix"]
         self.final_data = self.parameters["final_data"]
         self.original_stations = self.parameters["original_stations"]
         self.Q = self.parameters["Q"]
@@ -28,6 +30,15 @@ class Helper:
         self.g = self.parameters["g"]
         self.h = self.parameters["h"]
         self.v = self.parameters["v"]
+        # resource labels of the recently checked routes, keyed by the route tuple
+        self.labels_cache = {}
+        self.labels_cache_size = 4096
+        # granular neighbour lists and sets of each node, keyed by the number of neighbours
+        self.neighbour_lists = {}
+        self.neighbour_sets = {}
+        # client positions and depot or station positions of the recently searched routes, keyed by the route tuple
+        self.route_index_cache = {}
+        self.route_index_cache_size = 4096
 
     def get_routes_dict(self, incidence_dict):
         """
@@ -79,7 +90,8 @@ class Helper:
         :param incidence_dict: the binary arcs with 0 and 1
         :return: the total traveled distance
         """
-        return sum(self.arcs[i, j] * incidence_dict[i, j] for i in self.all_nodes for j in self.all_nodes)
+        arcs = self.parameters["arcs"]
+        return sum(arcs[i, j] * incidence_dict[i, j] for i in self.all_nodes for j in self.all_nodes)
 
     def total_distance_list(self, routes):
         """
@@ -97,7 +109,7 @@ class Helper:
         """
         total_distance = 0
         for i in range(len(route)):
-            if route[i] == "D0_end":
+            if route[i] == self.depot_end:
                 break
             else:
                 total_distance += self.arcs[route[i], route[i + 1]]
@@ -117,7 +129,10 @@ class Helper:
         :param route: list of nodes of a route
         :return: true if yes and false otherwise
         """
-        return route[0] == "D0" and route[-1] == "D0_end" and route.count("D0") == 1 and route.count("D0_end") == 1
+        return (
+                route[0] == self.depot_start and route[-1] == self.depot_end and route.count(self.depot_start) == 1
+                and route.count(self.depot_end) == 1
+        )
 
     def feasible_route(self, route):
         """
@@ -129,3 +144,157 @@ class Helper:
 
     def feasible(self, routes):
         return all(self.feasible_route(route) for route in routes)
+
+    def route_labels(self, route):
+        """
+        This is the function to get the resource labels of a route, cached since most routes survive an iteration
+        :param route: list of nodes
+        :return: RouteLabels, feasible is true only if the whole route is feasible
+        """
+        key = tuple(route)
+        labels = self.labels_cache.get(key)
+        if labels is None:
+            labels = self.checker.route_labels(key)
+            labels.feasible = labels.feasible and labels.load <= self.C and self.depot_check(key)
+            if len(self.labels_cache) >= self.labels_cache_size:
+                self.labels_cache.clear()
+            self.labels_cache[key] = labels
+        return labels
+
+    def nearest_neighbours(self, k):
+        """
+        Find the k nearest clients of each client that can be visited right before or right after it, meaning the
+        earliest departure from one of them reaches the other before its due date
+        :param k: number of neighbours
+        :return: array of the neighbour ids, one row per node, -1 for the missing ones and the rows of the non clients
+        """
+        clients = np.array(self.clients)
+        distance = self.parameters["distance_matrix"][np.ix_(clients, clients)]
+        times = self.parameters["time_matrix"][np.ix_(clients, clients)]
+        earliest_departure = (self.parameters["ready_time_array"] + self.parameters["service_time_array"])[clients]
+        due_date = self.parameters["due_date_array"][clients]
+
+        reachable = earliest_departure[:, None] + times <= due_date[None, :]
+        compatible = reachable | reachable.T
+        np.fill_diagonal(compatible, False)
+        distance = np.where(compatible, distance, np.inf)
+
+        k = max(min(k, len(clients) - 1), 0)
+        neighbours = np.full((len(self.is_client), k), -1)
+        if k:
+            nearest = np.argpartition(distance, k - 1, axis=1)[:, :k]
+            found = np.isfinite(np.take_along_axis(distance, nearest, axis=1))
+            neighbours[clients] = np.where(found, clients[nearest], -1)
+        return neighbours
+
+    def neighbourhoods(self, k):
+        """
+        The neighbourhoods an insertion searches in turn, the granular one and then the positions it left out as a
+        fallback, so that no position is tried twice
+        If the k neighbours are all the other clients, the granular neighbourhood only skips infeasible positions
+        :param k: number of neighbours, None for all the positions
+        :return: list of (number of neighbours, rest) to pass to insertion_positions
+        """
+        if k is None or k >= len(self.clients) - 1:
+            return [(None, False)]
+        return [(k, False), (k, True)]
+
+    def route_index(self, route):
+        """
+        This is the function to get the position of every node of a route, cached since a route is searched for
+        every client to insert
+        :param route: list of nodes
+        :return: dict of the position of each client, list of the positions of the depots and stations
+        """
+        key = tuple(route)
+        index = self.route_index_cache.get(key)
+        if index is None:
+            is_client = self.is_client
+            client_positions = {}
+            other_positions = []
+            for position, node in enumerate(key):
+                if is_client[node]:
+                    client_positions[node] = position
+                else:
+                    other_positions.append(position)
+            index = (client_positions, other_positions)
+            if len(self.route_index_cache) >= self.route_index_cache_size:
+                self.route_index_cache.clear()
+            self.route_index_cache[key] = index
+        return index
+
+    def insertion_positions(self, route, client, k, rest=False):
+        """
+        The positions to try when inserting a client in a route: next to one of its k nearest neighbours,
+        or next to the depot or a station
+        The neighbours are located through the position index of the route, or the clients of the route are looked up
+        in the neighbour set if the route is the shorter, the cost is in the smaller of k and the number of clients of
+        the route, plus its number of stations
+        :param route: list of nodes
+        :param client: client to be inserted
+        :param k: number of neighbours, None for all the positions
+        :param rest: true for the positions that are not next to a neighbour, the depot or a station instead
+        :return: positions i in increasing order, inserting the client between route[i - 1] and route[i]
+        """
+        if k is None or k >= len(self.clients) - 1:
+            return range(0) if rest else range(1, len(route))
+        if rest:
+            granular = set(self.insertion_positions(route, client, k))
+            return [i for i in range(1, len(route)) if i not in granular]
+        if k not in self.neighbour_lists:
+            neighbours = self.nearest_neighbours(k).tolist()
+            self.neighbour_lists[k] = [[node for node in row if node >= 0] for row in neighbours]
+            self.neighbour_sets[k] = [set(row) for row in self.neighbour_lists[k]]
+        client_positions, other_positions = self.route_index(route)
+        neighbours = self.neighbour_lists[k][client]
+
+        # the positions right before and right after a neighbour, the depot or a station
+        positions = set()
+        for position in other_positions:
+            positions.add(position)
+            positions.add(position + 1)
+        if len(neighbours) <= len(client_positions):
+            for neighbour in neighbours:
+                position = client_positions.get(neighbour)
+                if position is not None:
+                    positions.add(position)
+                    positions.add(position + 1)
+        else:
+            neighbour_set = self.neighbour_sets[k][client]
+            for node, position in client_positions.items():
+                if node in neighbour_set:
+                    positions.add(position)
+                    positions.add(position + 1)
+        positions.discard(0)
+        positions.discard(len(route))
+        return sorted(positions)
+
+    def feasible_insertion(self, labels, node, position):
+        """
+        This is the function to check if inserting a customer keeps a route feasible, without building the new route
+        :param labels: resource labels of the route
+        :param node: the customer to insert
+        :param position: the index of the customer in the new route
+        :return: true if the new route is feasible and false otherwise
+        """
+        return (
+                labels.feasible and labels.load + self.demand[node] <= self.C and
+                self.checker.time_energy_insertion(labels, node, position)
+        )
+
+    def route_names(self, route):
+        """
+        This is the function to translate an integer encoded route back to the node names
+        :param route: list of node ids
+        :return: list of node names
+        """
+        return [self.all_nodes[node] for node in route]
+
+    def route_ids(self, route):
+        """
+        This is the function to encode a route given with node names into node ids
+        :param route: list of node names
+        :return: list of node ids
+        """
+        node_index = self.parameters["node_index"]
+        return [node_index[node] for node in route]
\ No newline at end of file
@@ -2,20 +2,52 @@ import numpy as np
 import random
 
 
+class RouteLabels:
+    """
+    Resource labels of one route, filled by MIPCheck.route_labels
+    Forward labels hold the arrival/departure time and energy at every position, backward labels hold the time slack
+    and the lowest arrival energy until the next recharge, so that one customer insertion is checked in constant time
+    """
+
+    def __init__(self, route):
+        length = len(route)
+        self.route = route
+        self.feasible = True
+        self.load = 0.0
+        # forward labels
+        self.arrival_time = [0.0] * length
+        self.departure_time = [0.0] * length
+        self.arrival_energy = [0.0] * length
+        self.departure_energy = [0.0] * length
+        self.waiting = [0.0] * length
+        self.waiting_before = [0.0] * (length + 1)
+        # backward labels
+        self.slack = [0.0] * length
+        self.segment_slack = [0.0] * length
+        self.segment_energy = [0.0] * length
+        self.next_station = [None] * length
+
+
 class MIPCheck:
+    # numbers of full route checks and insertion checks made by all the checkers of the process, for the telemetry
+    checks = 0
+    insertion_checks = 0
+
     def __init__(self, parameters):
         self.parameters = parameters
-        self.clients = self.parameters["clients"]
-        self.stations = self.parameters["stations"]
+        self.clients = self.parameters["client_ids"]
+        self.stations = self.parameters["station_ids"]
+        self.is_station = self.parameters["is_station"]
         self.all_nodes = self.parameters["all_nodes"]
-        self.depot_start = self.parameters["depot_start"]
-        self.depot_end = self.parameters["depot_end"]
-        self.demand = self.parameters["demand"]
-        self.ready_time = self.parameters["ready_time"]
-        self.due_date = self.parameters["due_date"]
-        self.service_time = self.parameters["service_time"]
-        self.arcs = self.parameters["arcs"]
-        self.times = self.parameters["normal_times"]
+        self.depot_start = self.parameters["depot_start_id"]
+        self.depot_end = self.parameters["depot_end_id"]
+        self.demand = self.parameters["demand_array"].tolist()
+        self.ready_time = self.parameters["ready_time_array"].tolist()
+        self.due_date = self.parameters["due_date_array"].tolist()
+        self.service_time = self.parameters["service_time_array"].tolist()
+        # the matrices are nested lists, indexing them with the node ids is faster than indexing the arrays
+        self.arcs = self.parameters["distance_matrix"].tolist()
+        self.times = self.parameters["time_matrix"].tolist()
         self.C = self.parameters["C"]
         self.Q = self.parameters["Q"]
         self.g = self.parameters["g"]
@@ -25,29 +57,27 @@ class MIPCheck:
         self.mean = self.parameters["mean"]
         
         # Wireless charging integration (silent)
-        if "net_energy_consumption" in self.parameters:
-            self.net_energy_consumption = self.parameters["net_energy_consumption"]
+        if "energy_matrix" in self.parameters:
+            self.net_energy_consumption = self.parameters["energy_matrix"].tolist()
         else:
             # Fallback to original energy calculation
-            self.net_energy_consumption = {}
-            for (i, j), distance in self.arcs.items():
-                self.net_energy_consumption[(i, j)] = self.h * distance
+            self.net_energy_consumption = (self.h * self.parameters["distance_matrix"]).tolist()
 
     def update_times(self, p, n):
         """Update travel times with stochastic variation"""
-        new_times = self.parameters["times"].copy()
-        for i in self.all_nodes:
-            for j in self.all_nodes:
+        new_times = self.parameters["time_matrix"].copy()
+        for i in range(len(new_times)):
+            for j in range(len(new_times)):
                 if i != j:
                     if random.random() < p:
                         stochastic = np.random.normal(0, n*self.std, 1)[0]
                         if new_times[i,j] + stochastic > 0:
                             new_times[i,j] = new_times[i,j] + stochastic
-        self.times = new_times
+        self.times = new_times.tolist()
 
     def get_energy_consumption(self, node_i, node_j):
         """Get energy consumption for arc (i,j) - uses wireless charging if available"""
-        return self.net_energy_consumption[node_i, node_j]
+        return self.net_energy_consumption[node_i][node_j]
 
     def time_energy(self, route) -> bool:
         """
@@ -55,9 +85,12 @@ class MIPCheck:
         :param route: the list of nodes, one route
         :return: true if the route is feasible, false otherwise
         """
+        MIPCheck.checks += 1
         if len(route) < 2:
             return True
         
+        times = self.times
+        energy = self.net_energy_consumption
         try:
             # Initialize at depot
             current_time = self.ready_time[route[0]]
@@ -68,10 +101,10 @@ class MIPCheck:
                 next_node = route[i + 1]
                 
                 # === TIME CONSTRAINTS ===
-                travel_time = self.times[current_node, next_node]
+                travel_time = times[current_node][next_node]
                 
                 # Add service time for current node (not for stations during charging)
-                if current_node in self.stations:
+                if self.is_station[current_node]:
                     # At station: add recharging time
                     # For simplicity, assume full recharge (can be modified for partial)
                     recharge_amount = self.Q - current_energy
@@ -94,7 +127,7 @@ class MIPCheck:
                 current_time = max(current_time, self.ready_time[next_node])
                 
                 # === ENERGY CONSTRAINTS ===
-                energy_consumption = self.get_energy_consumption(current_node, next_node)
+                energy_consumption = energy[current_node][next_node]
                 current_energy -= energy_consumption
                 
                 # Check if we have enough energy
@@ -103,10 +136,112 @@ class MIPCheck:
             
             return True
             
-        except (KeyError, ZeroDivisionError, ValueError):
+        except (KeyError, IndexError, ZeroDivisionError, ValueError):
             # Handle any errors gracefully
             return False
 
+    def route_labels(self, route) -> RouteLabels:
+        """
+        Compute the resource labels of a route, same time and energy rules as time_energy
+        :param route: the list of nodes, one route
+        :return: RouteLabels of the route, feasible tells whether the time and energy constraints hold
+        """
+        labels = RouteLabels(route)
+        length = len(route)
+
+        # forward pass: arrival and departure time and energy at each position
+        current_time = self.ready_time[route[0]]
+        current_energy = self.Q
+        for i in range(length):
+            node = route[i]
+            labels.load += self.demand[node]
+            if i > 0:
+                previous_node = route[i - 1]
+                current_time = labels.departure_time[i - 1] + self.times[previous_node][node]
+                current_energy = labels.departure_energy[i - 1] - self.get_energy_consumption(previous_node, node)
+                if current_time > self.due_date[node] or current_energy < 0:
+                    labels.feasible = False
+                start_time = max(current_time, self.ready_time[node])
+                labels.waiting[i] = start_time - current_time
+            else:
+                start_time = current_time
+            labels.arrival_time[i] = current_time
+            labels.arrival_energy[i] = current_energy
+            labels.waiting_before[i + 1] = labels.waiting_before[i] + labels.waiting[i]
+
+            if self.is_station[node]:
+                recharge_amount = self.Q - current_energy
+                if recharge_amount > 0:
+                    start_time += recharge_amount / self.g
+                current_energy = self.Q
+            else:
+                start_time += self.service_time[node]
+            labels.departure_time[i] = start_time
+            labels.departure_energy[i] = current_energy
+
+        # backward pass: the slack is the largest delay of the arrival at a position the rest of the route can absorb,
+        # the segment labels stop at the next station since the energy is recharged there
+        for i in range(length - 1, -1, -1):
+            node = route[i]
+            time_left = self.due_date[node] - labels.arrival_time[i]
+            if i == length - 1:
+                labels.slack[i] = time_left
+            else:
+                labels.slack[i] = min(time_left, labels.waiting[i] + labels.slack[i + 1])
+
+            segment_slack = time_left + labels.waiting_before[i]
+            if self.is_station[node] or i == length - 1:
+                labels.segment_slack[i] = segment_slack
+                labels.segment_energy[i] = labels.arrival_energy[i]
+                labels.next_station[i] = i if self.is_station[node] else None
+            else:
+                labels.segment_slack[i] = min(segment_slack, labels.segment_slack[i + 1])
+                labels.segment_energy[i] = min(labels.arrival_energy[i], labels.segment_energy[i + 1])
+                labels.next_station[i] = labels.next_station[i + 1]
+
+        return labels
+
+    def time_energy_insertion(self, labels, node, position) -> bool:
+        """
+        Check the time and energy constraints after inserting a customer, using the labels of a feasible route
+        :param labels: RouteLabels of the route before the insertion
+        :param node: the customer to insert
+        :param position: index in the route where the customer is inserted, between 1 and len(route) - 1
+        :return: true if the route with the insertion satisfies the time and energy constraints
+        """
+        MIPCheck.insertion_checks += 1
+        route = labels.route
+        previous_node = route[position - 1]
+        next_node = route[position]
+
+        # energy on arrival at the customer and the extra consumption until the next recharge
+        energy_in = self.get_energy_consumption(previous_node, node)
+        if labels.departure_energy[position - 1] - energy_in < 0:
+            return False
+        extra_energy = (energy_in + self.get_energy_consumption(node, next_node) -
+                        self.get_energy_consumption(previous_node, next_node))
+        if labels.segment_energy[position] - extra_energy < 0:
+            return False
+
+        # time window of the customer and the delay of the arrival at the next node
+        arrival_time = labels.departure_time[position - 1] + self.times[previous_node][node]
+        if arrival_time > self.due_date[node]:
+            return False
+        departure_time = max(arrival_time, self.ready_time[node]) + self.service_time[node]
+        delay = departure_time + self.times[node][next_node] - labels.arrival_time[position]
+        if delay > labels.segment_slack[position] - labels.waiting_before[position]:
+            return False
+
+        # the delay left after the next station grows with the longer recharge of the missing energy
+        station = labels.next_station[position]
+        if station is not None and station < len(route) - 1:
+            recharge_amount = self.Q - labels.arrival_energy[station]
+            extra_recharge = (max(recharge_amount + extra_energy, 0) - max(recharge_amount, 0)) / self.g
+            waiting = labels.waiting_before[station + 1] - labels.waiting_before[position]
+            if max(0.0, delay - waiting) + extra_recharge > labels.slack[station + 1]:
+                return False
+        return True
+
     def time(self, route) -> bool:
         """
         Fast feasibility check for time constraints only
@@ -124,11 +259,11 @@ class MIPCheck:
                 next_node = route[i + 1]
                 
                 # Add service time (stations don't have service time in time-only check)
-                if current_node not in self.stations:
+                if not self.is_station[current_node]:
                     current_time += self.service_time[current_node]
                 
                 # Travel time
-                travel_time = self.times[current_node, next_node]
+                travel_time = self.times[current_node][next_node]
                 current_time += travel_time
                 
                 # Check time window
@@ -140,7 +275,7 @@ class MIPCheck:
             
             return True
             
-        except (KeyError, ValueError):
+        except (KeyError, IndexError, ValueError):
             return False
 
     def energy(self, route) -> bool:
@@ -160,7 +295,7 @@ class MIPCheck:
                 next_node = route[i + 1]
                 
                 # Recharge at stations
-                if current_node in self.stations:
+                if self.is_station[current_node]:
                     current_energy = self.Q  # Full recharge
                 
                 # Consume energy for travel
@@ -173,7 +308,7 @@ class MIPCheck:
             
             return True
             
-        except (KeyError, ValueError):
+        except (KeyError, IndexError, ValueError):
             return False
 
     def time_extractor(self, route):
@@ -195,7 +330,7 @@ class MIPCheck:
                 next_node = route[i + 1]
                 
                 # Add service/recharge time at current node
-                if current_node in self.stations:
+                if self.is_station[current_node]:
                     # Estimate recharge time (assuming some recharge needed)
                     recharge_time = (self.Q * 0.5) / self.g  # Rough estimate
                     current_time += recharge_time
@@ -203,7 +338,7 @@ class MIPCheck:
                     current_time += self.service_time[current_node]
                 
                 # Travel to next node
-                travel_time = self.times[current_node, next_node]
+                travel_time = self.times[current_node][next_node]
                 current_time += travel_time
                 
                 # Adjust for time window
@@ -212,7 +347,7 @@ class MIPCheck:
             
             return times
             
-        except (KeyError, ValueError):
+        except (KeyError, IndexError, ValueError):
             raise Exception("This route is not feasible")
 
     def energy_extractor(self, route):
@@ -234,7 +369,7 @@ class MIPCheck:
                 next_node = route[i + 1]
                 
                 # Recharge at stations (before leaving)
-                if current_node in self.stations:
+                if self.is_station[current_node]:
                     current_energy = self.Q
                 
                 # Consume energy for travel
@@ -245,7 +380,7 @@ class MIPCheck:
             
             return energies
             
-        except (KeyError, ValueError):
+        except (KeyError, IndexError, ValueError):
             raise Exception("This route is not feasible")
 
     def energy_extractor_departure(self, route):
@@ -265,7 +400,7 @@ class MIPCheck:
                 current_node = route[i]
                 
                 # Recharge at stations
-                if current_node in self.stations:
+                if self.is_station[current_node]:
                     current_energy = self.Q  # Full recharge
                 
                 departure_energies.append(current_energy)
@@ -278,5 +413,5 @@ class MIPCheck:
             
             return departure_energies
             
-        except (KeyError, ValueError):
+        except (KeyError, IndexError, ValueError):
             raise Exception("This route is not feasible")
\ No newline at end of file
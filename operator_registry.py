@@ -0,0 +1,182 @@
+from random import random
+import numpy as np
+
+
+class OperatorRegistry:
+    """
+    The operators of one category of the ALNS with their weights, segment scores and calling times in arrays
+    The roulette wheel selection uses an alias table, built again only when the weights change at the end of a segment,
+    so that selecting an operator takes a single random number and constant time
+    """
+
+    def __init__(self, category):
+        """
+        Create an empty registry
+        :param category: category of the operators, "normal_cr", "route_cr", "ci", "sr" or "si"
+        """
+        self.category = category
+        self.names = []
+        self.functions = []
+        self.index = {}
+        self.initial_weights = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.scores = np.zeros(0)
+        self.calls = np.zeros(0, dtype=int)
+        self.probability = []
+        self.alias = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def register(self, name, function, weight=1.0):
+        """
+        Void function, add an operator, or replace the function of an operator with the same name
+        :param name: name of the operator
+        :param function: the operator function
+        :param weight: weight of the operator at the start of a run
+        """
+        if name in self.index:
+            k = self.index[name]
+            self.functions[k] = function
+            self.initial_weights[k] = weight
+        else:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+            self.functions.append(function)
+            self.initial_weights = np.append(self.initial_weights, float(weight))
+        self.reset()
+
+    def unregister(self, name):
+        """
+        Void function, remove an operator
+        :param name: name of the operator
+        """
+        k = self.index[name]
+        del self.names[k]
+        del self.functions[k]
+        self.initial_weights = np.delete(self.initial_weights, k)
+        self.index = {name: k for k, name in enumerate(self.names)}
+        self.reset()
+
+    def function_dict(self):
+        """
+        :return: dict of the operator functions, keyed by name in the order of registration
+        """
+        return dict(zip(self.names, self.functions))
+
+    def function(self, name):
+        """
+        :param name: name of the operator
+        :return: the operator function
+        """
+        return self.functions[self.index[name]]
+
+    def reset(self):
+        """
+        Void function, set the weights back to their initial values and the scores and calling times to 0
+        """
+        self.weights = self.initial_weights.copy()
+        self.scores = np.zeros(len(self.names))
+        self.calls = np.zeros(len(self.names), dtype=int)
+        self.build_alias()
+
+    def build_alias(self):
+        """
+        Void function, build the alias table of the weights with the method of Vose
+        """
+        n = len(self.names)
+        total = self.weights.sum()
+        if n == 0:
+            self.probability, self.alias = [], []
+            return
+        if total <= 0:
+            # no weight left, the selection is uniform
+            self.probability, self.alias = [1.0] * n, list(range(n))
+            return
+
+        scaled = (self.weights * n / total).tolist()
+        probability = [1.0] * n
+        alias = list(range(n))
+        small = [k for k in range(n) if scaled[k] < 1]
+        large = [k for k in range(n) if scaled[k] >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            probability[less] = scaled[less]
+            alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+        # the remaining columns are full, up to the rounding errors
+        self.probability, self.alias = probability, alias
+
+    def select(self):
+        """
+        Select an operator with a probability proportional to its weight
+        :return: name of the operator
+        """
+        n = len(self.names)
+        u = random() * n
+        k = min(int(u), n - 1)
+        if u - k < self.probability[k]:
+            return self.names[k]
+        return self.names[self.alias[k]]
+
+    def called(self, name):
+        """
+        Void function, count a call of an operator in the current segment
+        :param name: name of the operator
+        """
+        self.calls[self.index[name]] += 1
+
+    def credit(self, name, sigma):
+        """
+        Void function, add a score to an operator in the current segment
+        :param name: name of the operator
+        :param sigma: score
+        """
+        self.scores[self.index[name]] += sigma
+
+    def update_weights(self, rho, times=None, mean_time=0.0):
+        """
+        Void function, update the weights of the operators called in the segment, reset the scores and calling times
+        and build the alias table again
+        :param rho: reaction factor of the weights
+        :param times: array of the run time of each operator in the segment, None to reward the score per call.
+        With times, the reward is the score per second multiplied by mean_time, the operators without time get
+        their score per call
+        :param mean_time: mean time of a call in the category
+        """
+        called = self.calls != 0
+        calls = np.where(called, self.calls, 1)
+        reward = rho * self.scores / calls
+        if times is not None and mean_time > 0:
+            timed = called & (times > 0)
+            reward = np.where(timed, rho * self.scores / np.where(timed, times, 1.0) * mean_time, reward)
+        self.weights = np.where(called, self.weights * (1 - rho) + reward, self.weights)
+        self.scores = np.zeros(len(self.names))
+        self.calls = np.zeros(len(self.names), dtype=int)
+        self.build_alias()
+
+    def get_state(self):
+        """
+        :return: dict of the names, weights, scores and calling times, for a checkpoint
+        """
+        return {"names": list(self.names),
+                "weights": self.weights.tolist(),
+                "scores": self.scores.tolist(),
+                "calls": self.calls.tolist()}
+
+    def set_state(self, state):
+        """
+        Void function, restore the weights, scores and calling times of a checkpoint
+        :param state: dict returned by get_state, with the same operator names
+        """
+        if state["names"] != self.names:
+            raise ValueError("the operators of the checkpoint do not match the registry " + self.category)
+        self.weights = np.array(state["weights"], dtype=float)
+        self.scores = np.array(state["scores"], dtype=float)
+        self.calls = np.array(state["calls"], dtype=int)
+        self.build_alias()
@@ -0,0 +1,364 @@
+from EVRPTW_PR_ALNS.ALNS import ALNS
+from EVRPTW_PR_ALNS.run_options import ParallelHooks
+from EVRPTW_PR_ALNS.file_reader import get_parameters
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+from queue import Empty
+from time import time
+from math import exp
+import random
+import numpy as np
+
+# the ALNS of a worker process, built once by the initializer of the pool from the shared parameters
+_worker_alns = None
+
+
+def init_worker(parameters, wireless_coverage, neighbour_k=None):
+    """
+    Void function, initializer of the worker processes, the parameters are sent once to each worker
+    :param parameters: parameters got from the file reader in the main process
+    :param wireless_coverage: wireless coverage level of the parameters
+    :param neighbour_k: number of granular neighbours of the customer insertions, None for every position
+    """
+    global _worker_alns
+    _worker_alns = ALNS(wireless_coverage=wireless_coverage, parameters=parameters, neighbour_k=neighbour_k)
+
+
+def seed_everything(seed):
+    """
+    Void function, seed the random generators used by the ALNS
+    :param seed: integer seed
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def better(result, other):
+    """
+    Compare two results of ALNS.run the same way the ALNS compares solutions
+    :return: true if the result has fewer vehicles, or as many vehicles and a shorter distance
+    """
+    return result[1] < other[1] or (result[1] == other[1] and result[0] < other[0])
+
+
+def run_seeded(seed, run_kwargs):
+    """
+    Run the ALNS of the worker with a seed
+    :param seed: integer seed
+    :param run_kwargs: parameters of ALNS.run
+    :return: the seed and the result of ALNS.run
+    """
+    seed_everything(seed)
+    return seed, _worker_alns.run(**run_kwargs)
+
+
+def repair_seeded(seed, cr_algo, ci_algo, routes, route_removal):
+    """
+    Destroy and repair a solution with the ALNS of the worker and a seed
+    :param seed: integer seed
+    :param cr_algo: name of the removal
+    :param ci_algo: name of the customer insertion
+    :param routes: solution
+    :param route_removal: true if the removal is a route removal
+    :return: repaired routes
+    """
+    seed_everything(seed)
+    return _worker_alns.repair_pair(cr_algo, ci_algo, routes, route_removal)
+
+
+def batch_run(file, batch_size, workers=None, wireless_coverage="none", seed=0, neighbour_k=None, route_batch_size=1,
+              **run_kwargs):
+    """
+    Run one ALNS evaluating its batches of destroy and repair pairs in a process pool, the customer batches of each
+    iteration and the batches of the route removal phase
+    :param file: instance file path
+    :param batch_size: number of customer removal and insertion pairs evaluated on the current solution at each
+    iteration
+    :param workers: number of worker processes, the number of cores if None
+    :param wireless_coverage: wireless coverage level ("none", "light", "moderate", "high")
+    :param seed: integer seed of the search, each evaluation gets a seed drawn from it
+    :param neighbour_k: number of granular neighbours of the customer insertions, None for every position
+    :param route_batch_size: number of route removal attempts evaluated in a batch during the route removal phase
+    :param run_kwargs: parameters of ALNS.run
+    :return: the result of ALNS.run
+    """
+    parameters = get_parameters(file, wireless_coverage=wireless_coverage)
+    alns = ALNS(wireless_coverage=wireless_coverage, parameters=parameters, neighbour_k=neighbour_k)
+    seed_everything(seed)
+
+    with ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker, initargs=(parameters, wireless_coverage, neighbour_k)
+    ) as executor:
+        def evaluate(pairs, routes, route_removal=False):
+            routes = [list(route) for route in routes]
+            seeds = [random.randrange(2 ** 32) for _ in pairs]
+            return list(executor.map(
+                repair_seeded, seeds, [pair[0] for pair in pairs], [pair[1] for pair in pairs],
+                [routes] * len(pairs), [route_removal] * len(pairs)
+            ))
+
+        hooks = ParallelHooks(batch_size=batch_size, route_batch_size=route_batch_size, evaluate=evaluate)
+        return alns.run(parallel=hooks, **run_kwargs)
+
+
+def multi_start(file, runs, workers=None, wireless_coverage="none", seeds=None, neighbour_k=None, **run_kwargs):
+    """
+    Run independent seeded ALNS in a process pool and keep the best solution
+    The instance is read once, the workers get the parameters through the initializer of the pool
+    :param file: instance file path
+    :param runs: number of independent runs
+    :param workers: number of worker processes, the number of cores if None
+    :param wireless_coverage: wireless coverage level ("none", "light", "moderate", "high")
+    :param seeds: seeds of the runs, 0 to runs - 1 if None
+    :param neighbour_k: number of granular neighbours of the customer insertions, None for every position
+    :param run_kwargs: parameters of ALNS.run
+    :return: dict with the best result of ALNS.run, its seed, the statistics of every run and the wall time
+    """
+    parameters = get_parameters(file, wireless_coverage=wireless_coverage)
+    if seeds is None:
+        seeds = list(range(runs))
+
+    start_time = time()
+    with ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker, initargs=(parameters, wireless_coverage, neighbour_k)
+    ) as executor:
+        results = list(executor.map(run_seeded, seeds, [run_kwargs] * len(seeds)))
+
+    return summarise(results, time() - start_time)
+
+
+def summarise(results, duration):
+    """
+    Keep the best of the results of several runs and their statistics
+    :param results: list of (seed, result of ALNS.run)
+    :param duration: wall time of all the runs
+    :return: dict with the best result of ALNS.run, its seed, the statistics of every run and the wall time
+    """
+    best_seed, best_result = results[0]
+    statistics = []
+    for seed, result in results:
+        if better(result, best_result):
+            best_seed, best_result = seed, result
+        statistics.append({"seed": seed,
+                           "distance": result[0],
+                           "vehicles": result[1],
+                           "initial_distance": result[2],
+                           "initial_vehicles": result[3],
+                           "duration": result[4]})
+
+    return {"best": best_result,
+            "seed": best_seed,
+            "runs": statistics,
+            "duration": duration}
+
+
+def migration_targets(index, islands, topology):
+    """
+    Find the islands an island sends its best solution to
+    :param index: index of the island
+    :param islands: number of islands
+    :param topology: "ring" to send to the next island, "broadcast" to send to all the other islands
+    :return: list of island indexes
+    """
+    if topology == "ring":
+        return [(index + 1) % islands] if islands > 1 else []
+    if topology == "broadcast":
+        return [other for other in range(islands) if other != index]
+    raise ValueError("unknown migration topology: " + str(topology))
+
+
+def run_island(index, seed, inboxes, topology, migration_interval, run_kwargs):
+    """
+    Run the ALNS of the worker as an island, exchanging its best solution through the queues of the islands
+    :param index: index of the island
+    :param seed: integer seed
+    :param inboxes: list of the queues of the islands, receiving the migrating solutions
+    :param topology: migration topology, "ring" or "broadcast"
+    :param migration_interval: number of iterations between two migrations
+    :param run_kwargs: parameters of ALNS.run
+    :return: the seed and the result of ALNS.run
+    """
+    targets = migration_targets(index, len(inboxes), topology)
+
+    def migration(routes):
+        # send the best solution, then take all the solutions received since the last migration without waiting
+        for target in targets:
+            inboxes[target].put([list(route) for route in routes])
+        received = []
+        while True:
+            try:
+                received.append(inboxes[index].get_nowait())
+            except Empty:
+                return received
+
+    seed_everything(seed)
+    hooks = ParallelHooks(migration=migration, migration_interval=migration_interval)
+    return seed, _worker_alns.run(parallel=hooks, **run_kwargs)
+
+
+def island_model(
+        file, islands, migration_interval=100, topology="ring", wireless_coverage="none", seeds=None, neighbour_k=None,
+        **run_kwargs
+):
+    """
+    Run a cooperative ALNS on several islands, one process each
+    Every migration_interval iterations an island sends its best solution to its targets in the topology, and adopts
+    a received solution if it is better than its own best
+    :param file: instance file path
+    :param islands: number of islands, each one runs in its own process
+    :param migration_interval: number of iterations between two migrations
+    :param topology: "ring" to send to the next island, "broadcast" to send to all the other islands
+    :param wireless_coverage: wireless coverage level ("none", "light", "moderate", "high")
+    :param seeds: seeds of the islands, 0 to islands - 1 if None
+    :param neighbour_k: number of granular neighbours of the customer insertions, None for every position
+    :param run_kwargs: parameters of ALNS.run
+    :return: dict with the best result of ALNS.run, its seed, the statistics of every island and the wall time
+    """
+    # check the topology before starting any process
+    migration_targets(0, islands, topology)
+    parameters = get_parameters(file, wireless_coverage=wireless_coverage)
+    if seeds is None:
+        seeds = list(range(islands))
+
+    start_time = time()
+    with Manager() as manager, ProcessPoolExecutor(
+            max_workers=islands, initializer=init_worker, initargs=(parameters, wireless_coverage, neighbour_k)
+    ) as executor:
+        inboxes = [manager.Queue() for _ in range(islands)]
+        futures = [
+            executor.submit(run_island, index, seeds[index], inboxes, topology, migration_interval, run_kwargs)
+            for index in range(islands)
+        ]
+        results = [future.result() for future in futures]
+
+    return summarise(results, time() - start_time)
+
+
+def run_replica(index, seed, mu, states, inbox, swap_interval, run_kwargs):
+    """
+    Run the ALNS of the worker as a replica of the parallel tempering, at the temperature given by mu
+    :param index: index of the replica
+    :param seed: integer seed
+    :param mu: mu of the ALNS, the temperature accepts a solution mu worse than the initial one with probability 0.5
+    :param states: queue of the coordinator, receiving the current solutions of the replicas
+    :param inbox: queue of the replica, receiving the solution to continue with after each swap
+    :param swap_interval: number of iterations between two swaps
+    :param run_kwargs: parameters of ALNS.run
+    :return: the seed and the result of ALNS.run
+    """
+    def swap(routes, distance, temperature):
+        # wait for the coordinator to decide the swaps of this round
+        states.put((index, [list(route) for route in routes], distance, temperature))
+        return inbox.get()
+
+    seed_everything(seed)
+    try:
+        hooks = ParallelHooks(swap=swap, swap_interval=swap_interval)
+        return seed, _worker_alns.run(mu=mu, parallel=hooks, **run_kwargs)
+    finally:
+        # tell the coordinator this replica does not take part in the swaps anymore
+        states.put((index, None, None, None))
+
+
+def metropolis_swap(cold, hot, uniform):
+    """
+    The Metropolis criterion of a swap between the current solutions of two replicas
+    The number of vehicles comes first, as in the ALNS: the hot solution is taken if it has fewer vehicles
+    :param cold: (index, routes, distance, temperature) of the replica with the lower temperature
+    :param hot: (index, routes, distance, temperature) of the replica with the higher temperature
+    :param uniform: random number in [0, 1)
+    :return: true if the two solutions are swapped
+    """
+    if len(cold[1]) != len(hot[1]):
+        return len(hot[1]) < len(cold[1])
+    exponent = (cold[2] - hot[2]) * (1 / cold[3] - 1 / hot[3])
+    return exponent >= 0 or uniform < exp(exponent)
+
+
+def parallel_tempering(
+        file, replicas, swap_interval=100, mu_min=0.01, mu_max=0.2, wireless_coverage="none", seeds=None,
+        neighbour_k=None, **run_kwargs
+):
+    """
+    Run replicas of the ALNS at fixed temperatures, one process each, with Metropolis swaps of their current solutions
+    The temperatures follow a geometric ladder of mu from mu_min to mu_max and do not decay, unless an epsilon is given.
+    Every swap_interval iterations the neighbouring replicas of the ladder, alternately the even and the odd pairs,
+    try to swap their current solutions
+    :param file: instance file path
+    :param replicas: number of replicas, each one runs in its own process
+    :param swap_interval: number of iterations between two swaps
+    :param mu_min: mu of the coldest replica
+    :param mu_max: mu of the hottest replica
+    :param wireless_coverage: wireless coverage level ("none", "light", "moderate", "high")
+    :param seeds: seeds of the replicas, 0 to replicas - 1 if None, the first one also seeds the swaps
+    :param neighbour_k: number of granular neighbours of the customer insertions, None for every position
+    :param run_kwargs: parameters of ALNS.run
+    :return: dict with the best result of ALNS.run, its seed, the statistics of every replica, the wall time and
+    the numbers of attempted and accepted swaps
+    """
+    parameters = get_parameters(file, wireless_coverage=wireless_coverage)
+    if seeds is None:
+        seeds = list(range(replicas))
+    if replicas > 1:
+        mus = [mu_min * (mu_max / mu_min) ** (r / (replicas - 1)) for r in range(replicas)]
+    else:
+        mus = [mu_min]
+    run_kwargs.setdefault("epsilon", 1.0)
+    generator = random.Random(seeds[0])
+    attempted = 0
+    accepted = 0
+
+    start_time = time()
+    with Manager() as manager, ProcessPoolExecutor(
+            max_workers=replicas, initializer=init_worker, initargs=(parameters, wireless_coverage, neighbour_k)
+    ) as executor:
+        states = manager.Queue()
+        inboxes = [manager.Queue() for _ in range(replicas)]
+        futures = [
+            executor.submit(
+                run_replica, index, seeds[index], mus[index], states, inboxes[index], swap_interval, run_kwargs
+            )
+            for index in range(replicas)
+        ]
+
+        active = set(range(replicas))
+        swap_round = 0
+        while active:
+            # wait for the current solution of every replica still running
+            reports = {}
+            while set(reports) != active:
+                try:
+                    index, routes, distance, temperature = states.get(timeout=1)
+                except Empty:
+                    # a replica failing before its run never reports, raise its error instead of waiting forever
+                    for future in futures:
+                        if future.done() and future.exception() is not None:
+                            raise future.exception()
+                    continue
+                if routes is None:
+                    active.discard(index)
+                    reports.pop(index, None)
+                else:
+                    reports[index] = (index, routes, distance, temperature)
+            if not reports:
+                break
+
+            # try to swap the neighbours in the ladder, the solutions move along the temperatures
+            ladder = sorted(reports.values(), key=lambda report: report[3])
+            routes = {report[0]: report[1] for report in ladder}
+            for k in range(swap_round % 2, len(ladder) - 1, 2):
+                cold, hot = ladder[k], ladder[k + 1]
+                attempted += 1
+                if metropolis_swap(cold, hot, generator.random()):
+                    accepted += 1
+                    routes[cold[0]], routes[hot[0]] = hot[1], cold[1]
+            for index in reports:
+                inboxes[index].put(routes[index])
+            swap_round += 1
+
+        results = [future.result() for future in futures]
+
+    summary = summarise(results, time() - start_time)
+    summary["swaps_attempted"] = attempted
+    summary["swaps_accepted"] = accepted
+    return summary
@@ -0,0 +1,83 @@
+class StoppingCriteria:
+    """
+    Criteria stopping an ALNS run before its N iterations
+    """
+
+    def __init__(self, time_limit=None, target=None, max_stagnation=None):
+        """
+        :param time_limit: wall-clock limit of the iterations in seconds, None for no limit. It is also checked between
+        the repairs of an iteration, a route removal phase or a batch stops early when the time is over
+        :param target: (number of vehicles, distance), the run stops as soon as the best solution has fewer vehicles,
+        or as many vehicles and a distance not greater, None for no target
+        :param max_stagnation: number of iterations without a new best solution after which the run stops, None for
+        no limit
+        """
+        if time_limit is not None and time_limit < 0:
+            raise ValueError("the time limit must not be negative: " + str(time_limit))
+        if target is not None and len(target) != 2:
+            raise ValueError("the target must be (number of vehicles, distance): " + str(target))
+        if max_stagnation is not None and max_stagnation < 1:
+            raise ValueError("the stagnation limit must be at least 1: " + str(max_stagnation))
+        self.time_limit = time_limit
+        self.target = target
+        self.max_stagnation = max_stagnation
+
+
+class Checkpointing:
+    """
+    Saving of the search state of an ALNS run, and the checkpoint it resumes from
+    """
+
+    def __init__(self, file=None, interval=1000, resume=None):
+        """
+        :param file: file the search state is saved to every interval iterations, None for no saving
+        :param interval: number of iterations between two checkpoints
+        :param resume: checkpoint file to resume the search from, with the same parameters as the saved run, the
+        search then continues exactly as the saved run would have
+        """
+        if interval < 1:
+            raise ValueError("the checkpoint interval must be at least 1: " + str(interval))
+        self.file = file
+        self.interval = interval
+        self.resume = resume
+
+
+class ParallelHooks:
+    """
+    Hooks of an ALNS run taking part in a parallel search, and its batches of destroy and repair pairs
+    """
+
+    def __init__(self, migration=None, migration_interval=100, swap=None, swap_interval=100, batch_size=1,
+                 route_batch_size=1, evaluate=None):
+        """
+        :param migration: function called every migration_interval iterations with the routes of the best solution,
+        returns a list of solutions (list of routes) received from other searches, None for a single search
+        :param migration_interval: number of iterations between two migrations
+        :param swap: function called every swap_interval iterations with the routes and the distance of the current
+        solution and the temperature, returns the routes of the solution to continue with, None for a single search
+        :param swap_interval: number of iterations between two swaps
+        :param batch_size: number of pairs of customer removal and insertion tried on the current solution at each
+        iteration, the best repair goes through the acceptance and every pair gets the credit of its own repair
+        :param route_batch_size: number of route removal attempts made in a batch from the same current solution
+        during the route removal phase, the best repair of each batch goes through the acceptance
+        :param evaluate: function taking the list of (removal, insertion) names, the current solution and whether the
+        removals are route removals, returns the list of repaired routes. It repairs the batches of more than one
+        pair, the pairs are repaired one after the other in this process if None
+        """
+        if migration_interval < 1 or swap_interval < 1:
+            raise ValueError("the migration and swap intervals must be at least 1")
+        if batch_size < 1 or route_batch_size < 1:
+            raise ValueError("the batch sizes must be at least 1")
+        self.migration = migration
+        self.migration_interval = migration_interval
+        self.swap = swap
+        self.swap_interval = swap_interval
+        self.batch_size = batch_size
+        self.route_batch_size = route_batch_size
+        self.evaluate = evaluate
+
+    def batched(self):
+        """
+        :return: true if some repairs are made in batches of more than one pair
+        """
+        return self.batch_size > 1 or self.route_batch_size > 1
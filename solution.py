@@ -0,0 +1,197 @@
+class Solution:
+    """
+    A solution of the ALNS, the list of routes with the distance, load and feasibility of each route cached
+    Routes changed since the last evaluation are dirty, only those are evaluated again when a value is asked
+    The position of every client, (route index, node index), is indexed lazily, when it is asked for the first time.
+    A solution derived from an indexed one takes over the index of its parent then and only indexes the routes that
+    changed, other solutions build it from all their routes. Once built, it is kept up to date when a route is set or
+    appended
+    """
+
+    def __init__(self, helper, routes, parent=None):
+        """
+        Take the routes of a solution, reuse the cached values of the parent for the routes it already evaluated
+        :param helper: helper of the graph instance, evaluates the routes
+        :param routes: list of routes
+        :param parent: the solution these routes are derived from, or None
+        """
+        self.helper = helper
+        self.routes = list(routes)
+        self.route_distance = [0.0] * len(self.routes)
+        self.route_load = [0.0] * len(self.routes)
+        self.route_feasible = [False] * len(self.routes)
+        self.dirty = set()
+        self.total_distance = 0.0
+        self.changed = True
+        # client -> (route index, node index), None until it is asked for the first time
+        self.positions = None
+        # indexed parent and indexes of the routes that differ from it, to build the index from the parent's
+        self.index_parent = None
+        self.index_changed = None
+
+        if parent is not None:
+            parent.evaluate()
+            parent_index = {id(route): index for index, route in enumerate(parent.routes)}
+            if parent.positions is not None:
+                self.index_parent = parent
+                self.index_changed = set(range(len(self.routes), len(parent.routes)))
+
+        for index, route in enumerate(self.routes):
+            if parent is None:
+                self.dirty.add(index)
+                continue
+            # the same route object, or an equal route at the same position, keeps the values of the parent
+            reused = parent_index.get(id(route))
+            if reused is None and index < len(parent.routes) and route == parent.routes[index]:
+                reused = index
+            if reused is None:
+                self.dirty.add(index)
+            else:
+                self.route_distance[index] = parent.route_distance[reused]
+                self.route_load[index] = parent.route_load[reused]
+                self.route_feasible[index] = parent.route_feasible[reused]
+            if self.index_changed is not None and reused != index:
+                self.index_changed.add(index)
+
+    def __len__(self):
+        return len(self.routes)
+
+    def __iter__(self):
+        return iter(self.routes)
+
+    def __getitem__(self, index):
+        return self.routes[index]
+
+    def __setitem__(self, index, route):
+        index = index % len(self.routes)
+        if self.index_changed is not None:
+            self.index_changed.add(index)
+        if self.positions is not None:
+            for node in self.routes[index]:
+                if self.positions.get(node, (None,))[0] == index:
+                    del self.positions[node]
+            self.index_route(index, route)
+        self.routes[index] = route
+        self.dirty.add(index)
+        self.changed = True
+
+    def __contains__(self, route):
+        return route in self.routes
+
+    def append(self, route):
+        """
+        Add a new route at the end of the solution
+        :param route: list of nodes
+        """
+        self.routes.append(route)
+        if self.index_changed is not None:
+            self.index_changed.add(len(self.routes) - 1)
+        if self.positions is not None:
+            self.index_route(len(self.routes) - 1, route)
+        self.route_distance.append(0.0)
+        self.route_load.append(0.0)
+        self.route_feasible.append(False)
+        self.dirty.add(len(self.routes) - 1)
+        self.changed = True
+
+    def remove(self, route):
+        """
+        Remove the first route equal to the argument, same as list.remove
+        :param route: list of nodes
+        """
+        index = self.routes.index(route)
+        del self.routes[index]
+        del self.route_distance[index]
+        del self.route_load[index]
+        del self.route_feasible[index]
+        self.dirty = {i if i < index else i - 1 for i in self.dirty if i != index}
+        self.changed = True
+        # the routes after the removed one move, the positions are indexed again when asked
+        self.positions = None
+        self.index_parent = None
+        self.index_changed = None
+
+    def index_route(self, index, route):
+        """
+        Void function, add the clients of a route to the position index
+        :param index: index of the route in the solution
+        :param route: list of nodes
+        """
+        is_client = self.helper.is_client
+        for position, node in enumerate(route):
+            if is_client[node]:
+                self.positions[node] = (index, position)
+
+    def locate(self, client):
+        """
+        Find where a client is served
+        :param client: client id
+        :return: (route index, node index) of the client, None if no route serves it
+        """
+        if self.positions is None:
+            self.build_positions()
+        return self.positions.get(client)
+
+    def build_positions(self):
+        """
+        Void function, build the position index, from the index of the parent if it has one
+        """
+        parent = self.index_parent
+        if parent is not None and parent.positions is not None:
+            # drop the clients of the changed routes of the parent, then index the changed routes
+            self.positions = dict(parent.positions)
+            for index in self.index_changed:
+                if index < len(parent.routes):
+                    for node in parent.routes[index]:
+                        if self.positions.get(node, (None,))[0] == index:
+                            del self.positions[node]
+            for index in self.index_changed:
+                if index < len(self.routes):
+                    self.index_route(index, self.routes[index])
+        else:
+            self.positions = {}
+            for index, route in enumerate(self.routes):
+                self.index_route(index, route)
+        # the parent is not needed any more, it is released
+        self.index_parent = None
+        self.index_changed = None
+
+    def derive(self, routes):
+        """
+        Create the solution of the routes returned by an operator applied on this solution
+        :param routes: list of routes
+        :return: new Solution sharing the values of the unchanged routes
+        """
+        return Solution(self.helper, routes, parent=self)
+
+    def evaluate(self):
+        """
+        Void function, evaluate the dirty routes and the total distance
+        """
+        if not self.changed:
+            return
+        for index in self.dirty:
+            route = self.routes[index]
+            self.route_distance[index] = self.helper.distance_one_route(route)
+            self.route_load[index] = sum(self.helper.demand[node] for node in route)
+            self.route_feasible[index] = self.helper.feasible_route(route)
+        self.dirty = set()
+        # summed from the cached values in the route order, so equal solutions always have the same total
+        self.total_distance = sum(self.route_distance)
+        self.changed = False
+
+    @property
+    def distance(self):
+        """
+        :return: total distance of the solution
+        """
+        self.evaluate()
+        return self.total_distance
+
+    @property
+    def feasible(self):
+        """
+        :return: true if all the routes are feasible
+        """
+        self.evaluate()
+        return all(self.route_feasible)
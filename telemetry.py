@@ -0,0 +1,142 @@
+from EVRPTW_PR_ALNS.mip_check import MIPCheck
+from time import perf_counter
+import json
+import csv
+
+
+class Telemetry:
+    """
+    Performance counters of the operators of an ALNS run, one counter per (category, operator name)
+    selected, feasible, accepted and new_best count the iterations the operator was chosen in and their outcome,
+    evaluation_checks the feasibility checks of MIPCheck made by the evaluation of the repairs of these iterations,
+    calls, time, checks and insertion_checks count the calls of the operator function in this process, with their
+    wall time and the feasibility checks of MIPCheck they made
+    """
+    fields = ["selected", "feasible", "accepted", "new_best", "evaluation_checks", "calls", "time", "checks",
+              "insertion_checks"]
+
+    def __init__(self):
+        self.counters = {}
+
+    def counter(self, category, name):
+        """
+        Get the counter of an operator, created at the first use
+        :param category: category of the operator, "normal_cr", "route_cr", "ci", "sr" or "si"
+        :param name: name of the operator in its function dict
+        :return: dict of the counts
+        """
+        key = (category, name)
+        if key not in self.counters:
+            self.counters[key] = {field: 0 for field in self.fields}
+            self.counters[key]["time"] = 0.0
+        return self.counters[key]
+
+    def instrument(self, category, functions):
+        """
+        Wrap the functions of an operator dict to measure their calls
+        :param category: category of the operators
+        :param functions: dict of the operator functions, keyed by name
+        :return: dict of the measured functions, same keys
+        """
+        return {name: self.measured(category, name, function) for name, function in functions.items()}
+
+    def measured(self, category, name, function):
+        """
+        Wrap an operator function to count its calls, wall time and feasibility checks
+        :return: function with the same arguments and result
+        """
+        counter = self.counter(category, name)
+
+        def measured_function(*args, **kwargs):
+            checks = MIPCheck.checks
+            insertion_checks = MIPCheck.insertion_checks
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                counter["time"] += perf_counter() - start
+                counter["calls"] += 1
+                counter["checks"] += MIPCheck.checks - checks
+                counter["insertion_checks"] += MIPCheck.insertion_checks - insertion_checks
+
+        return measured_function
+
+    @staticmethod
+    def evaluate(solution):
+        """
+        Evaluate a repaired solution before its acceptance
+        :param solution: the repaired solution
+        :return: number of feasibility checks of MIPCheck made by the evaluation
+        """
+        checks = MIPCheck.checks
+        solution.evaluate()
+        return MIPCheck.checks - checks
+
+    def outcome(self, operators, repair, prev_solution, best_solution, checks=0):
+        """
+        Void function, count the outcome of an iteration for the operators chosen in it
+        :param operators: list of (category, name) of the chosen operators
+        :param repair: the repaired solution
+        :param prev_solution: the current solution after the acceptance
+        :param best_solution: the best solution after the acceptance
+        :param checks: feasibility checks made by the evaluation of the repair, returned by evaluate
+        """
+        feasible = repair.feasible
+        accepted = prev_solution is repair
+        new_best = best_solution is repair
+        for category, name in operators:
+            counter = self.counter(category, name)
+            counter["selected"] += 1
+            counter["feasible"] += feasible
+            counter["accepted"] += accepted
+            counter["new_best"] += new_best
+            counter["evaluation_checks"] += checks
+
+    def get_state(self):
+        """
+        :return: list of the counters with their (category, name), for a checkpoint
+        """
+        return [((category, name), dict(counts)) for (category, name), counts in self.counters.items()]
+
+    def set_state(self, state):
+        """
+        Void function, restore the counters of a checkpoint. The counters are updated in place, so that the functions
+        already measured keep counting in them
+        :param state: list returned by get_state
+        """
+        for (category, name), counts in state:
+            self.counter(category, name).update(counts)
+
+    def rows(self):
+        """
+        :return: list of dicts, one per operator, with its category, name and counts
+        """
+        return [dict(category=category, name=name, **counts) for (category, name), counts in self.counters.items()]
+
+    def to_json(self, file):
+        """
+        Void function, export the counters as a JSON list
+        :param file: output file path
+        """
+        with open(file, "w") as f:
+            json.dump(self.rows(), f, indent=2)
+
+    def to_csv(self, file):
+        """
+        Void function, export the counters as a CSV table, one row per operator
+        :param file: output file path
+        """
+        with open(file, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["category", "name"] + self.fields)
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+    def export(self, file):
+        """
+        Void function, export the counters as CSV if the file name ends with .csv, as JSON otherwise
+        :param file: output file path
+        """
+        if file.lower().endswith(".csv"):
+            self.to_csv(file)
+        else:
+            self.to_json(file)
@@ -0,0 +1,49 @@
+import importlib.util
+import random
+import os
+import sys
+import pytest
+
+# the modules import each other as EVRPTW_PR_ALNS, the checkout is loaded under this name if it is not installed
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if importlib.util.find_spec("EVRPTW_PR_ALNS") is None:
+    spec = importlib.util.spec_from_file_location(
+        "EVRPTW_PR_ALNS", os.path.join(root, "__init__.py"), submodule_search_locations=[root]
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules["EVRPTW_PR_ALNS"] = package
+    spec.loader.exec_module(package)
+
+
+def write_instance(file, clients, stations=10, seed=0):
+    """
+    Void function, write a random instance in the format of the instance files, on a 100 x 100 square
+    :param file: output file path
+    :param clients: number of customers
+    :param stations: number of recharging stations besides the one at the depot
+    :param seed: seed of the coordinates and the time windows
+    """
+    generator = random.Random(seed)
+    rows = [("D0", "d", 50.0, 50.0, 0.0, 0.0, 1000.0, 0.0), ("S0", "f", 50.0, 50.0, 0.0, 0.0, 1000.0, 0.0)]
+    for k in range(1, stations + 1):
+        rows.append(("S%d" % k, "f", generator.uniform(0, 100), generator.uniform(0, 100), 0.0, 0.0, 1000.0, 0.0))
+    for k in range(1, clients + 1):
+        ready = generator.uniform(100, 700)
+        rows.append(("C%d" % k, "c", generator.uniform(0, 100), generator.uniform(0, 100), generator.randint(5, 20),
+                     ready, ready + generator.uniform(120, 200), 10.0))
+    with open(file, "w") as f:
+        f.write("StringID   Type       x          y          demand     ReadyTime  DueDate    ServiceTime\n")
+        for row in rows:
+            f.write("%-10s %-10s %-10.1f %-10.1f %-10.1f %-10.1f %-10.1f %-10.1f\n" % row)
+        f.write("\nQ Vehicle fuel tank capacity /79.69/\nC Vehicle load capacity /200.0/\n"
+                "r fuel consumption rate /1.0/\ng inverse refueling rate /3.39/\nv average Velocity /1.0/\n")
+
+
+@pytest.fixture(scope="session")
+def instance_file(tmp_path_factory):
+    """
+    :return: path of a random instance of 100 customers
+    """
+    file = str(tmp_path_factory.mktemp("instances") / "c100.txt")
+    write_instance(file, 100)
+    return file
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from EVRPTW_PR_ALNS.file_reader import arc_coverage
+
+
+def test_crossing_arc():
+    # a lane 1 wide across an arc of length 100 covers 1 of it
+    coverage = arc_coverage([[0, 0], [100, 0]], [[50, -10, 50, 10]], width=1.0)
+    assert coverage[0, 1] == pytest.approx(0.01)
+    assert coverage[1, 0] == coverage[0, 1]
+    assert coverage[0, 0] == 0.0
+
+
+def test_arc_along_a_lane():
+    coverage = arc_coverage([[0, 0], [100, 0]], [[0, 0, 100, 0]], width=1.0)
+    assert coverage[0, 1] == pytest.approx(1.0)
+    # two overlapping lanes along the arc are counted once
+    coverage = arc_coverage([[0, 0], [100, 0]], [[0, 0, 60, 0], [40, 0, 100, 0]], width=1.0)
+    assert coverage[0, 1] == pytest.approx(1.0)
+
+
+def test_arc_near_a_lane_end():
+    # the end of the lane is round, the arc passes 0.3 from its end point
+    coverage = arc_coverage([[0, 0], [100, 0]], [[50, 0.3, 50, 10]], width=1.0)
+    assert coverage[0, 1] == pytest.approx(2 * np.sqrt(0.25 - 0.09) / 100)
+
+
+def test_metre_scale():
+    coordinates = [[0, 0], [50000, 0], [0, 50000]]
+    segments = [[10000, -100, 10000, 100], [0, 20000, 0, 30000]]
+    coverage = arc_coverage(coordinates, segments, width=3.5)
+    assert coverage[0, 1] == pytest.approx(3.5 / 50000)
+    assert coverage[0, 2] == pytest.approx(10003.5 / 50000)
+    assert coverage[1, 2] == 0.0
+
+
+def test_against_sampling():
+    generator = np.random.default_rng(0)
+    coordinates = generator.uniform(0, 100, (12, 2))
+    segments = generator.uniform(0, 100, (20, 4))
+    coverage = arc_coverage(coordinates, segments, width=3.0)
+    t = np.linspace(0, 1, 20001)[:, None, None]
+    starts, axes = segments[None, :, :2], segments[None, :, 2:] - segments[None, :, :2]
+    for i in range(12):
+        for j in range(i + 1, 12):
+            points = coordinates[i] + (coordinates[j] - coordinates[i]) * t
+            along = np.clip(((points - starts) * axes).sum(axis=2) / (axes * axes).sum(axis=2), 0, 1)
+            gaps = np.linalg.norm(points - starts - along[..., None] * axes, axis=2)
+            assert coverage[i, j] == pytest.approx((gaps.min(axis=1) <= 1.5).mean(), abs=1e-3)
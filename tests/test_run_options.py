@@ -0,0 +1,23 @@
+import pytest
+from EVRPTW_PR_ALNS.ALNS import ALNS
+from EVRPTW_PR_ALNS.run_options import StoppingCriteria, Checkpointing, ParallelHooks
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        StoppingCriteria(target=(3,))
+    with pytest.raises(ValueError):
+        Checkpointing("state.gz", interval=0)
+    with pytest.raises(ValueError):
+        ParallelHooks(batch_size=0)
+
+
+def test_combinations_checked_before_the_search(instance_file, monkeypatch):
+    alns = ALNS(instance_file)
+    # the initial solution is never built for rejected options
+    monkeypatch.setattr(alns.initial, "initial_solution", None)
+    hooks = ParallelHooks(batch_size=4, evaluate=alns.evaluate_pairs)
+    with pytest.raises(ValueError):
+        alns.run(parallel=hooks, weighting="time")
+    with pytest.raises(ValueError):
+        alns.run(weighting="speed")
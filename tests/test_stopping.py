@@ -0,0 +1,31 @@
+from threading import Timer
+from time import time
+from EVRPTW_PR_ALNS.ALNS import ALNS
+from EVRPTW_PR_ALNS.run_options import StoppingCriteria
+
+
+def test_time_limit_in_route_removal(instance_file):
+    # every iteration is a long route removal phase, the limit is checked between its attempts
+    alns = ALNS(instance_file)
+    search = alns.iter_run(N=1000, NRR=1, nRR=200, stopping=StoppingCriteria(time_limit=2))
+    next(search)
+    start = time()
+    for _ in search:
+        pass
+    assert alns.stop_reason == "time"
+    assert time() - start < 2 + 1.5
+
+
+def test_cancel_in_route_removal(instance_file):
+    # cancelled from another thread in the middle of a long route removal phase
+    alns = ALNS(instance_file)
+    search = alns.iter_run(N=1000, NRR=1, nRR=200)
+    next(search)
+    timer = Timer(1, alns.cancel)
+    timer.start()
+    start = time()
+    for _ in search:
+        pass
+    timer.join()
+    assert alns.stop_reason == "cancelled"
+    assert time() - start < 1 + 1.5